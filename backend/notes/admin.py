@@ -1,19 +1,22 @@
 from django.contrib import admin
+from django.db.models import Count
 
-from .models import Category, Note
+from .models import Category, Note, Tag
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ["name", "color", "notes_count", "created_at"]
+    list_display = ["name", "color", "notes_count", "active_notes_count", "created_at"]
     search_fields = ["name"]
     list_filter = ["created_at"]
     ordering = ["name"]
 
-    def notes_count(self, obj):
-        return obj.notes.count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(notes_total=Count("notes"))
 
-    notes_count.short_description = "Notes Count"
+    @admin.display(description="Notes Count", ordering="notes_total")
+    def notes_count(self, obj):
+        return obj.notes_total
 
 
 @admin.register(Note)
@@ -30,3 +33,10 @@ class NoteAdmin(admin.ModelAdmin):
     list_filter = ["category", "priority", "is_pinned", "is_archived", "created_at"]
     ordering = ["-created_at"]
     list_editable = ["is_pinned", "is_archived", "priority"]
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ["name", "user", "created_at"]
+    search_fields = ["name"]
+    ordering = ["name"]
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class NotesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notes"
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
+        from .instrumentation import install_query_counter, metrics_enabled
+        from .search import ensure_search_index_post_migrate
+
+        post_migrate.connect(ensure_search_index_post_migrate, sender=self)
+        if metrics_enabled():
+            connection_created.connect(install_query_counter)
@@ -0,0 +1,80 @@
+"""
+Async read actions for viewsets served through ``asgi.py``.
+
+Under ASGI, Django runs each request's sync view in a thread created for
+that request. The thread is discarded afterwards, and its database
+connection goes with it. Django's async ORM methods (``aget``, ``acount``,
+``aiterator``) hop into that same per-request thread for every query, so
+they add round trips without letting more work overlap.
+
+``AsyncReadsMixin`` makes a viewset's views async instead. The actions
+named in ``async_read_actions`` run in one hop on a fixed pool of
+NOTES_READ_THREADS threads, including rendering. Pool threads are reused,
+so their connections persist as CONN_MAX_AGE allows (0 by default under
+``asgi.py``; set DATABASE_CONN_MAX_AGE to keep them). The number of reads
+touching the database at once is bounded by the pool size. Other actions
+go to Django's per-request thread as before.
+
+Async views cost an extra event loop per request under WSGI, and the pool
+did not beat the per-request threads on the reference benchmark, so the
+mixin is only active when NOTES_ASYNC_READS is set; an ASGI deployment opts
+in where ``benchmark_reads`` shows a gain.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, wraps
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+@cache
+def get_read_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.NOTES_READ_THREADS, thread_name_prefix="notes-read"
+    )
+
+
+def run_read(view, request, *args, **kwargs):
+    """Call ``view`` and render its response, on a read pool thread."""
+    # Pool threads outlive requests, so connection upkeep that Django does at
+    # request boundaries happens here.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+class AsyncReadsMixin:
+    """Serve ``async_read_actions`` from the read thread pool under ASGI."""
+
+    async_read_actions = ()
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        reads = {
+            method
+            for method, action in view.actions.items()
+            if action in cls.async_read_actions
+        }
+        if not settings.NOTES_ASYNC_READS or not reads:
+            return view
+
+        read = SyncToAsync(
+            run_read, thread_sensitive=False, executor=get_read_executor()
+        )
+        other = sync_to_async(view)
+
+        @wraps(view)
+        async def async_view(request, *args, **kwargs):
+            if request.method.lower() in reads:
+                return await read(view, request, *args, **kwargs)
+            return await other(request, *args, **kwargs)
+
+        return async_view
@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from drf_spectacular.utils import OpenApiExample, extend_schema
 from rest_framework import serializers, status
 from rest_framework.decorators import api_view, permission_classes
@@ -8,6 +10,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import Category
+from .passwords import hashing_view
 
 
 class LoginRequestSerializer(serializers.Serializer):
@@ -115,6 +118,7 @@ def login(request):
         ),
     ],
 )
+@hashing_view
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def signup(request):
@@ -127,26 +131,28 @@ def signup(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    exists = Response(
+        {"error": "User with this email already exists"},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
     if User.objects.filter(username=email).exists():
-        return Response(
-            {"error": "User with this email already exists"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    # Create user (using email as username)
-    user = User.objects.create_user(username=email, email=email, password=password)
-
-    # Create default categories for the new user
-    default_categories = [
-        {"name": "Random Thoughts", "color": "#FF6B6B"},
-        {"name": "School", "color": "#4ECDC4"},
-        {"name": "Personal", "color": "#45B7D1"},
-    ]
-
-    for cat_data in default_categories:
-        Category.objects.create(
-            name=cat_data["name"], color=cat_data["color"], user=user
-        )
+        return exists
+
+    # Create user (using email as username). Hashing the password is the slow
+    # part, so it happens before the transaction rather than inside it.
+    user = User(username=email, email=email)
+    user.set_password(password)
+    try:
+        # The user and their default categories are written together or not
+        # at all
+        with transaction.atomic():
+            user.save()
+            Category.objects.bulk_create(default_categories(user))
+    except IntegrityError:
+        # Another signup took the email since the check above
+        if User.objects.filter(username=email).exists():
+            return exists
+        raise
 
     # Generate tokens
     refresh = RefreshToken.for_user(user)
@@ -164,6 +170,14 @@ def signup(request):
     )
 
 
+def default_categories(user):
+    """Unsaved NOTES_DEFAULT_CATEGORIES for a new ``user``."""
+    return [
+        Category(user=user, name=category["name"], color=category["color"])
+        for category in settings.NOTES_DEFAULT_CATEGORIES
+    ]
+
+
 class UserProfileResponseSerializer(serializers.Serializer):
     user = serializers.JSONField()
 
@@ -0,0 +1,150 @@
+"""
+JWT authentication that verifies each access token once per process.
+
+simplejwt's ``JWTAuthentication`` checks the token's signature and claims
+and then loads its ``User`` row on every request, although an access token
+stays valid for ACCESS_TOKEN_LIFETIME (24 hours here) and the same one
+arrives with request after request. ``CachedJWTAuthentication`` keeps the
+outcome of that work in ``token_cache``, keyed by a SHA-256 digest of the
+token: the validated token, and the id, names, email and flags of its
+(active) user. A cached request builds its ``request.user`` from those
+fields without a query; other fields load from the database if something
+reads them.
+
+Entries last NOTES_AUTH_CACHE_TIMEOUT seconds, and never past the token's
+own ``exp``. At most NOTES_AUTH_CACHE_SIZE are kept; the least recently used
+go first. Saving or deleting a User drops its entries (see signals.py), so a
+deactivated user or changed password takes effect at once in this process.
+Other server processes keep their entries until they time out, so that
+timeout bounds how long a revoked user stays signed in elsewhere.
+``revoke_user()`` and ``revoke_token()`` drop entries directly, e.g. after
+a queryset ``update()`` of users, which sends no signals.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+# User fields kept in the cache; the rest are deferred. In the model's field
+# order, which is how Model.from_db() assigns them.
+USER_FIELDS = tuple(
+    field.attname
+    for field in User._meta.concrete_fields
+    if field.attname
+    in {
+        "id",
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "is_active",
+        "is_staff",
+        "is_superuser",
+    }
+)
+
+
+def token_key(raw_token):
+    return hashlib.sha256(raw_token).digest()
+
+
+class TokenCache:
+    """Thread-safe LRU of ``token key: (expires at, user values, token)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, raw_token):
+        """The ``(user, validated token)`` cached for ``raw_token``, or None."""
+        key = token_key(raw_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, values, token = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # A fresh instance per request, as the stock class loads
+        return User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values), token
+
+    def put(self, raw_token, user, token):
+        expires_at = min(time.time() + settings.NOTES_AUTH_CACHE_TIMEOUT, token["exp"])
+        values = tuple(getattr(user, field) for field in USER_FIELDS)
+        with self._lock:
+            self._entries[token_key(raw_token)] = (expires_at, values, token)
+            self._entries.move_to_end(token_key(raw_token))
+            while len(self._entries) > settings.NOTES_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def revoke_token(self, raw_token):
+        with self._lock:
+            self._entries.pop(token_key(raw_token), None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            for key in [
+                key
+                for key, (_, values, _) in self._entries.items()
+                if values[0] == user_id
+            ]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+def revoke_user(user_id):
+    """Make ``user_id``'s tokens go through full verification again."""
+    token_cache.revoke_user(user_id)
+
+
+def revoke_token(raw_token):
+    """Make ``raw_token`` (bytes) go through full verification again."""
+    token_cache.revoke_token(raw_token)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` answered from ``token_cache`` when it can."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return self.authenticate_token(raw_token)
+
+    def authenticate_token(self, raw_token):
+        """``(user, validated token)`` for ``raw_token``, verifying it if needed."""
+        cached = token_cache.get(raw_token)
+        if cached is not None:
+            return cached
+        token = self.get_validated_token(raw_token)
+        # Raises for unknown and inactive users, which are never cached
+        user = self.get_user(token)
+        token_cache.put(raw_token, user, token)
+        return user, token
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Documents ``CachedJWTAuthentication`` as the bearer scheme it accepts."""
+
+    target_class = CachedJWTAuthentication
@@ -0,0 +1,102 @@
+"""
+Bulk note operations for ``POST /api/notes/bulk/``.
+
+An operation runs as one ownership-checked ``UPDATE ... WHERE id IN (...)``
+(or ``DELETE``) in a single transaction, instead of a ``get_object()`` and a
+full-row ``save()`` per note. Queryset updates bypass ``Note.save()``, so
+the affected categories' ``active_notes_count`` is recomputed in one
+statement afterwards and the owner's cached stats and responses are dropped
+once. Deletes write their sync tombstones in one INSERT, and the owner's
+event stream gets one event for the whole batch.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .events import publish
+from .models import Category, Note, Tombstone
+from .response_cache import invalidate_responses
+from .signals import bulk_operation
+from .stats import invalidate_stats
+
+# Column values written by each update operation; set_category and delete
+# are handled separately.
+UPDATES = {
+    "pin": {"is_pinned": True},
+    "unpin": {"is_pinned": False},
+    "archive": {"is_archived": True},
+    "unarchive": {"is_archived": False},
+}
+OPERATIONS = [*UPDATES, "set_category", "delete"]
+
+# Operations that can change which category counts a note as active
+COUNTED_OPERATIONS = {"archive", "unarchive", "set_category", "delete"}
+
+
+def write_stamp():
+    """Columns every bulk update sets, as ``Note.save()`` would."""
+    return {"updated_at": timezone.now(), "version": F("version") + 1}
+
+
+def apply_bulk_operation(user, ids, operation, category=None):
+    """
+    Apply ``operation`` to the notes of ``user`` among ``ids``.
+
+    Returns one ``{"id", "status"}`` result per distinct id, in request order:
+    ``updated`` or ``deleted`` for the user's notes, ``not_found`` for ids
+    that do not exist or belong to someone else.
+    """
+    ids = list(dict.fromkeys(ids))
+    with transaction.atomic():
+        previous_categories = dict(
+            Note.objects.filter(user=user, pk__in=ids)
+            .select_for_update()
+            .values_list("pk", "category_id")
+        )
+        if previous_categories:
+            notes = Note.objects.filter(pk__in=previous_categories)
+            if operation == "delete":
+                # The per-note post_delete upkeep is replaced by the recount
+                # below; NoteTag rows and the search index follow by cascade.
+                with bulk_operation():
+                    notes.only("pk").delete()
+                Tombstone.objects.bulk_create(
+                    Tombstone(user=user, kind=Tombstone.NOTE, object_id=pk)
+                    for pk in previous_categories
+                )
+            elif operation == "set_category":
+                notes.update(category=category, **write_stamp())
+            else:
+                notes.update(**UPDATES[operation], **write_stamp())
+
+            if operation in COUNTED_OPERATIONS:
+                affected = set(previous_categories.values()) - {None}
+                if category is not None:
+                    affected.add(category.pk)
+                Category.objects.filter(pk__in=affected).refresh_notes_count()
+            invalidate_stats(user.pk)
+            invalidate_responses(user.pk)
+            publish(
+                user.pk,
+                {
+                    "type": "notes.bulk",
+                    "operation": operation,
+                    "ids": list(previous_categories),
+                },
+            )
+
+    status = "deleted" if operation == "delete" else "updated"
+    return [
+        {"id": pk, "status": status if pk in previous_categories else "not_found"}
+        for pk in ids
+    ]
+
+
+def bulk_summary(operation, results):
+    """The bulk action's response for ``apply_bulk_operation()``'s ``results``."""
+    return {
+        "operation": operation,
+        "processed": sum(result["status"] != "not_found" for result in results),
+        "results": results,
+    }
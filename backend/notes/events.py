@@ -0,0 +1,279 @@
+"""
+Server-sent change notifications at ``/api/events/``.
+
+Every note and category write publishes a small event to the owner's
+channel once its transaction commits (see ``signals.py`` and ``bulk.py``):
+``{"type": "note.updated", "id": 7, "version": 4}``,
+``{"type": "category.deleted", "id": 2}``, or one
+``{"type": "notes.bulk", "operation": "archive", "ids": [...]}`` per bulk
+operation. ``events_view`` streams them to each of the user's connections as
+``text/event-stream``, so clients learn about changes without polling and
+fetch them through the sync action.
+
+Browsers' ``EventSource`` cannot send an Authorization header, and an access
+token in the URL would end up in proxy and access logs. Such clients first
+``POST /api/events/ticket/`` with their token for a ``StreamTicket``: a
+random value redeemable once, within NOTES_EVENTS_TICKET_TIMEOUT seconds, as
+``?ticket=``. The stream it opens still closes when the access token would
+have expired.
+
+The view is async and holds no thread while idle, so it must be served
+through ``asgi.py``. Under WSGI (``runserver``, sync gunicorn workers) Django
+would read the whole stream before sending any of it, holding a thread until
+the token expires, so both endpoints answer 501 there instead. Events travel through the broker named by
+``NOTES_EVENTS_BROKER``. The default ``InProcessBroker`` only reaches
+connections held by the process that made the write. With several worker
+processes, use a subclass whose ``publish()`` sends events to a shared
+service and which calls ``fan_out()`` in every process for the events it
+receives.
+"""
+
+import asyncio
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from drf_spectacular.utils import extend_schema
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import CachedJWTAuthentication
+from .models import StreamTicket
+
+# Sent in place of events a slow connection had no room for; the client
+# should sync to catch up.
+RESYNC = {"type": "resync"}
+
+# The body of the 501 both endpoints answer outside ASGI
+ASGI_REQUIRED = {"detail": "The event stream is only served through asgi.py."}
+
+
+class Subscription:
+    """One connection's queue of events, filled from any thread."""
+
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.NOTES_EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, RESYNC after an overflow, or TimeoutError."""
+        if self.queue.empty() and self.overflowed:
+            self.overflowed = False
+            return RESYNC
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan events out to the subscriptions held by this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions[subscription.user_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, event):
+        self.fan_out(user_id, event)
+
+    def fan_out(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+
+@cache
+def get_broker():
+    return import_string(settings.NOTES_EVENTS_BROKER)()
+
+
+def publish(user_id, event):
+    """Send ``event`` to ``user_id``'s connections once the transaction commits."""
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+def ticket_digest(ticket):
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def issue_ticket(user, stream_expires_at):
+    """A new ticket opening ``user``'s event stream until ``stream_expires_at``."""
+    now = timezone.now()
+    StreamTicket.objects.filter(expires_at__lte=now).delete()
+    ticket = secrets.token_urlsafe(32)
+    StreamTicket.objects.create(
+        digest=ticket_digest(ticket),
+        user=user,
+        expires_at=now + timedelta(seconds=settings.NOTES_EVENTS_TICKET_TIMEOUT),
+        stream_expires_at=stream_expires_at,
+    )
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """
+    The user and stream expiry (a Unix time) of ``ticket``, which is used up;
+    None unless it is unused, unexpired and its user still active.
+    """
+    entry = (
+        StreamTicket.objects.select_related("user")
+        .filter(digest=ticket_digest(ticket), expires_at__gt=timezone.now())
+        .first()
+    )
+    # Of two concurrent redemptions, only the one that deletes the row wins
+    if entry is None or not StreamTicket.objects.filter(pk=entry.pk).delete()[0]:
+        return None
+    if not entry.user.is_active:
+        return None
+    return entry.user, entry.stream_expires_at.timestamp()
+
+
+def authenticate(request):
+    """
+    The user and stream expiry (a Unix time) for the request: the access
+    token's expiry for the Authorization header, or the issuing token's for
+    a ``ticket`` query parameter.
+    """
+    authentication = CachedJWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        ticket = request.GET.get("ticket", "")
+        if not ticket:
+            return None, None
+        redeemed = redeem_ticket(ticket)
+        if redeemed is None:
+            raise AuthenticationFailed("Invalid or expired stream ticket.")
+        return redeemed
+    raw_token = authentication.get_raw_token(header)
+    if not raw_token:
+        return None, None
+    user, token = authentication.authenticate_token(raw_token)
+    return user, token["exp"]
+
+
+def format_event(event):
+    return f"event: change\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def event_stream(user_id, expires_at):
+    """
+    Yield ``user_id``'s events, a comment every NOTES_EVENTS_HEARTBEAT
+    seconds to keep proxies from closing the connection, and stop when the
+    access token expires so the client reconnects with a fresh one.
+    """
+    heartbeat = settings.NOTES_EVENTS_HEARTBEAT
+    # Subscribed on first iteration, in the event loop that serves the stream
+    subscription = get_broker().subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                return
+            try:
+                event = await subscription.get(min(heartbeat, remaining))
+            except TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(event)
+    finally:
+        subscription.close()
+
+
+async def events_view(request):
+    if request.method != "GET":
+        return HttpResponse(status=405, headers={"Allow": "GET"})
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(ASGI_REQUIRED, status=501)
+    try:
+        user, expires_at = await sync_to_async(authenticate)(request)
+    except AuthenticationFailed as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return JsonResponse(detail, status=401)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    return StreamingHttpResponse(
+        event_stream(user.pk, expires_at),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@extend_schema(
+    request=None,
+    responses={
+        201: {
+            "type": "object",
+            "properties": {
+                "ticket": {"type": "string"},
+                "expires_in": {"type": "integer"},
+            },
+        },
+        501: {"type": "object", "properties": {"detail": {"type": "string"}}},
+    },
+    summary="Ticket for the change event stream",
+    description="A single-use ticket for opening /api/events/?ticket=<ticket> "
+    "within expires_in seconds, for clients such as EventSource that cannot "
+    "send the Authorization header. 501 when the server does not run under "
+    "ASGI, where there is no stream to open.",
+)
+@api_view(["POST"])
+def events_ticket(request):
+    if not isinstance(request._request, ASGIRequest):
+        return Response(ASGI_REQUIRED, status=status.HTTP_501_NOT_IMPLEMENTED)
+    if request.auth is not None:
+        stream_expires_at = datetime.fromtimestamp(request.auth["exp"], tz=UTC)
+    else:
+        # Authenticated without a token (e.g. force_authenticate())
+        stream_expires_at = timezone.now() + jwt_settings.ACCESS_TOKEN_LIFETIME
+    ticket = issue_ticket(request.user, stream_expires_at)
+    return Response(
+        {"ticket": ticket, "expires_in": settings.NOTES_EVENTS_TICKET_TIMEOUT},
+        status=status.HTTP_201_CREATED,
+    )
@@ -0,0 +1,216 @@
+"""
+Streamed exports of a user's notes, for the export action.
+
+``export_response()`` writes every note of a queryset, with its category and
+tags, in one of EXPORT_FORMATS:
+
+- ``jsonl``: one JSON object per line, with the notes list's fields (and
+  ``content``).
+- ``csv``: one row per note, tags joined with ", ".
+- ``markdown-zip``: a zip archive with a Markdown file per note in a folder
+  per category, its metadata in YAML front matter.
+
+Notes are read with ``QuerySet.iterator()`` and written as they arrive, in
+chunks of one database fetch, so memory use stays flat however many notes
+there are, under WSGI and ASGI alike (see ``streaming_content()``). The
+zip archive is written to a stream that cannot seek, so each entry's sizes
+follow its data instead of preceding it; only the archive's index, written
+last, grows with the number of notes.
+"""
+
+import csv
+import datetime
+import json
+import zipfile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .renderers import FastJSONRenderer
+from .serializers import NoteListSerializer
+from .streaming import STREAM_CHUNK_SIZE, streaming_content
+
+# NoteListSerializer fields written for each note
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "content",
+    "category",
+    "category_name",
+    "category_color",
+    "priority",
+    "is_pinned",
+    "is_archived",
+    "tag_list",
+    "version",
+    "created_at",
+    "updated_at",
+]
+
+
+class JSONLinesExport:
+    content_type = "application/x-ndjson"
+    extension = "jsonl"
+
+    def __init__(self):
+        self.renderer = FastJSONRenderer()
+
+    def begin(self):
+        return b""
+
+    def write(self, data):
+        return self.renderer.render(data) + b"\n"
+
+    def end(self):
+        return b""
+
+
+class LineBuffer:
+    """A file for ``csv.writer`` that hands back each line written to it."""
+
+    def write(self, line):
+        return line
+
+
+class CSVExport:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+    columns = [
+        "id",
+        "title",
+        "content",
+        "category",
+        "category_name",
+        "category_color",
+        "priority",
+        "is_pinned",
+        "is_archived",
+        "tags",
+        "version",
+        "created_at",
+        "updated_at",
+    ]
+
+    def __init__(self):
+        self.writer = csv.DictWriter(
+            LineBuffer(), fieldnames=self.columns, extrasaction="ignore"
+        )
+
+    def begin(self):
+        return self.writer.writeheader().encode()
+
+    def write(self, data):
+        row = {**data, "tags": ", ".join(data["tag_list"])}
+        return self.writer.writerow(row).encode()
+
+    def end(self):
+        return b""
+
+
+class ZipSink:
+    """A write-only file collecting what ``zipfile`` writes until taken."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class MarkdownZipExport:
+    content_type = "application/zip"
+    extension = "zip"
+
+    # Front matter keys and the fields they come from
+    front_matter = [
+        ("title", "title"),
+        ("category", "category_name"),
+        ("tags", "tag_list"),
+        ("priority", "priority"),
+        ("pinned", "is_pinned"),
+        ("archived", "is_archived"),
+        ("created", "created_at"),
+        ("updated", "updated_at"),
+    ]
+
+    def __init__(self):
+        self.sink = ZipSink()
+        self.archive = zipfile.ZipFile(self.sink, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def begin(self):
+        return b""
+
+    def write(self, data):
+        folder = slugify(data.get("category_name") or "", allow_unicode=True)
+        name = slugify(data["title"], allow_unicode=True) or "note"
+        entry = zipfile.ZipInfo(
+            f"{folder or 'uncategorized'}/{name}-{data['id']}.md",
+            date_time=self.entry_time(data["updated_at"]),
+        )
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        self.archive.writestr(entry, self.document(data))
+        return self.sink.take()
+
+    def end(self):
+        self.archive.close()
+        return self.sink.take()
+
+    def document(self, data):
+        # JSON scalars and lists are valid YAML, and quote whatever needs it
+        lines = [
+            f"{key}: {json.dumps(data.get(field), ensure_ascii=False)}"
+            for key, field in self.front_matter
+        ]
+        return "\n".join(["---", *lines, "---", "", data["content"]]) + "\n"
+
+    @staticmethod
+    def entry_time(updated_at):
+        # Zip timestamps are local times no earlier than 1980
+        updated = timezone.localtime(datetime.datetime.fromisoformat(updated_at))
+        return max(updated.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+EXPORT_FORMATS = {
+    "jsonl": JSONLinesExport,
+    "csv": CSVExport,
+    "markdown-zip": MarkdownZipExport,
+}
+
+
+def export_chunks(notes, export, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield ``notes`` written by ``export``, ``chunk_size`` notes at a time."""
+    serializer = NoteListSerializer(fields=EXPORT_FIELDS)
+    chunk = [export.begin()]
+    for count, note in enumerate(notes, 1):
+        chunk.append(export.write(serializer.to_representation(note)))
+        if count % chunk_size == 0:
+            yield b"".join(chunk)
+            chunk = []
+    chunk.append(export.end())
+    yield b"".join(chunk)
+
+
+def export_filename(export):
+    return f"notes-{timezone.localdate():%Y-%m-%d}.{export.extension}"
+
+
+def export_response(request, queryset, export_format, chunk_size=STREAM_CHUNK_SIZE):
+    """Stream every note of ``queryset`` as a download in ``export_format``."""
+    export = EXPORT_FORMATS[export_format]()
+    filename = export_filename(export)
+    chunks = export_chunks(queryset.iterator(chunk_size=chunk_size), export, chunk_size)
+    return StreamingHttpResponse(
+        streaming_content(request, chunks),
+        content_type=export.content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
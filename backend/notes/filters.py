@@ -0,0 +1,44 @@
+from django.db.models import Exists, OuterRef
+from rest_framework import filters
+
+from .models import NoteTag, Tag
+from .search import parse_query
+
+
+def filter_by_tags(queryset, user, names, match_all=True):
+    """
+    Restrict ``queryset`` to notes tagged with ``names`` (case-insensitive).
+
+    With ``match_all`` a note needs every tag, otherwise any one of them. Each
+    tag becomes an indexed ``EXISTS`` lookup on the note/tag join table.
+    """
+    keys = {name.lower() for name in names if name}
+    if not keys:
+        return queryset
+    tag_ids = [tag.id for tag in Tag.objects.for_names(user.id, keys).values()]
+    if not tag_ids or (match_all and len(tag_ids) < len(keys)):
+        return queryset.none()
+    if match_all:
+        for tag_id in tag_ids:
+            queryset = queryset.filter(
+                Exists(NoteTag.objects.filter(note=OuterRef("pk"), tag_id=tag_id))
+            )
+        return queryset
+    return queryset.filter(
+        Exists(NoteTag.objects.filter(note=OuterRef("pk"), tag_id__in=tag_ids))
+    )
+
+
+class NoteOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that sorts search results by relevance.
+
+    An explicit ``ordering`` parameter still wins; without one, searches are
+    ordered by ``search_rank`` and fall back to the view's default ordering.
+    """
+
+    def get_default_ordering(self, view):
+        ordering = super().get_default_ordering(view) or []
+        if parse_query(view.request.query_params.get("search")):
+            return ["-search_rank", *ordering]
+        return ordering
@@ -0,0 +1,327 @@
+"""
+Bulk import of notes from files, for the import action and the
+``import_notes`` command.
+
+Readers turn a file in one of IMPORT_FORMATS into records, one at a time,
+so files of any size are parsed in constant memory. They read the files the
+export action writes (see export.py), and similar ones from other tools:
+
+- ``jsonl``: one JSON object per line.
+- ``csv``: a header row, then one row per note; ``tags`` joined with commas.
+- ``markdown-zip``: a zip archive of ``.md`` files, with optional YAML front
+  matter of ``key: value`` lines (``title``, ``category``, ``tags``,
+  ``priority``, ``pinned``, ``archived``). Without a title, the file name is
+  used.
+
+``import_notes()`` validates each record with NoteImportSerializer and
+writes the valid ones in batches of NOTES_IMPORT_BATCH_SIZE, each in its own
+transaction: the batch's categories are looked up (and the missing ones
+created) in a few queries, its notes are inserted with one ``bulk_create``,
+and their tags linked with another. Queryset inserts bypass ``Note.save()``
+and its signals, so, as in ``bulk.py``, each batch then recounts the
+affected categories, drops the owner's cached stats and responses, and
+publishes one event.
+
+A batch that fails rolls back alone. The error reports how many records the
+committed batches covered as ``resume_from``; importing the same file again
+with it skips those records and carries on from the failed batch.
+"""
+
+import codecs
+import csv
+import json
+import zipfile
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .events import publish
+from .models import Category, Note, NoteTag, Tag
+from .response_cache import invalidate_responses
+from .serializers import NoteImportSerializer
+from .stats import invalidate_stats
+
+# NoteImportSerializer fields, and the other names records may give them
+RECORD_FIELDS = {
+    "title": ("title",),
+    "content": ("content",),
+    "category_name": ("category_name", "category"),
+    "category_color": ("category_color", "color"),
+    "tag_list": ("tag_list", "tags"),
+    "priority": ("priority",),
+    "is_pinned": ("is_pinned", "pinned"),
+    "is_archived": ("is_archived", "archived"),
+}
+
+
+class ImportInterrupted(APIException):
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    default_code = "import_interrupted"
+
+    def __init__(self, reason, result, status_code=None):
+        self.result = result
+        if status_code is not None:
+            self.status_code = status_code
+        super().__init__(
+            f"The import stopped after record {result['records']}: {reason}"
+        )
+        # Set directly, as APIException would turn the numbers into strings
+        self.detail = {
+            "detail": self.detail,
+            **result,
+            "resume_from": result["records"],
+        }
+
+
+class MalformedRecord:
+    """Stands in for a record that could not be read at all."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def normalize(data):
+    """The NoteImportSerializer fields given by ``data``, under their own names."""
+    record = {}
+    for field, names in RECORD_FIELDS.items():
+        for name in names:
+            value = data.get(name)
+            # Exported notes give the category's id as "category"
+            if value is None or (name == "category" and not isinstance(value, str)):
+                continue
+            if field == "tag_list" and isinstance(value, str):
+                value = [tag.strip() for tag in value.split(",") if tag.strip()]
+            record[field] = value
+            break
+    return record
+
+
+def read_jsonl(file):
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield MalformedRecord(f"Invalid JSON: {exc}")
+            continue
+        if not isinstance(data, dict):
+            yield MalformedRecord("Expected a JSON object.")
+            continue
+        yield normalize(data)
+
+
+def read_csv(file):
+    for row in csv.DictReader(codecs.iterdecode(file, "utf-8-sig")):
+        # Empty cells are missing values, except for the text itself
+        yield normalize(
+            {
+                name: value
+                for name, value in row.items()
+                if value or name in ("title", "content")
+            }
+        )
+
+
+def front_matter_value(text):
+    """A front matter value: JSON, a YAML flow list, or plain text."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    if text.startswith("[") and text.endswith("]"):
+        return [item.strip().strip("'\"") for item in text[1:-1].split(",")]
+    return text
+
+
+def parse_markdown(text, default_title):
+    data = {"title": default_title}
+    if text.startswith("---\n"):
+        end = text.find("\n---\n", 3)
+        if end != -1:
+            for line in text[4:end].splitlines():
+                key, separator, value = line.partition(":")
+                if separator and value.strip():
+                    data[key.strip()] = front_matter_value(value.strip())
+            text = text[end + 5 :]
+            # The blank line that follows the front matter
+            if text.startswith("\n"):
+                text = text[1:]
+    data["content"] = text.removesuffix("\n")
+    return normalize(data)
+
+
+def read_markdown_zip(file):
+    with zipfile.ZipFile(file) as archive:
+        for entry in archive.infolist():
+            if entry.is_dir() or not entry.filename.lower().endswith(".md"):
+                continue
+            try:
+                text = archive.read(entry).decode("utf-8-sig")
+            except UnicodeDecodeError:
+                yield MalformedRecord(f"{entry.filename} is not UTF-8 text.")
+                continue
+            yield parse_markdown(text, PurePosixPath(entry.filename).stem)
+
+
+IMPORT_FORMATS = {
+    "jsonl": read_jsonl,
+    "csv": read_csv,
+    "markdown-zip": read_markdown_zip,
+}
+
+FILE_SUFFIXES = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+    ".zip": "markdown-zip",
+}
+
+
+def format_for_filename(filename):
+    """The import format a file name's suffix suggests, or None."""
+    return FILE_SUFFIXES.get(PurePosixPath(filename).suffix.lower())
+
+
+def resolve_categories(user, records, known):
+    """
+    ``{name: id}`` for the categories ``records`` name, creating the user's
+    missing ones. ``known`` holds ids already looked up.
+    """
+    wanted = {record.get("category_name") for record in records} - {None, ""}
+    names = {name: known[name] for name in wanted if name in known}
+    missing = wanted - names.keys()
+    if missing:
+        names.update(
+            Category.objects.filter(user=user, name__in=missing).values_list(
+                "name", "pk"
+            )
+        )
+        colors = {
+            record["category_name"]: record["category_color"]
+            for record in records
+            if record.get("category_name") in missing and record.get("category_color")
+        }
+        new = [Category(user=user, name=name) for name in missing - names.keys()]
+        for category in new:
+            category.color = colors.get(category.name, category.color)
+        if new:
+            # ignore_conflicts tolerates concurrent creation of the same category
+            Category.objects.bulk_create(new, ignore_conflicts=True)
+            names.update(
+                Category.objects.filter(
+                    user=user, name__in=[category.name for category in new]
+                ).values_list("name", "pk")
+            )
+    return names
+
+
+def link_tags(user, notes):
+    """Point the new ``notes``' ``tag_objects`` at their tags, in one INSERT."""
+    names = {}
+    for note in notes:
+        for name in note.tag_list:
+            names.setdefault(name.lower(), name)
+    if not names:
+        return
+    tags = Tag.objects.ensure(user.pk, names.values())
+    NoteTag.objects.bulk_create(
+        NoteTag(note_id=note.pk, tag_id=tags[key].pk)
+        for note in notes
+        for key in {name.lower() for name in note.tag_list}
+    )
+
+
+def write_batch(user, records, categories):
+    """
+    Insert ``records`` (validated NoteImportSerializer data) for ``user`` in
+    one transaction. ``categories`` caches category ids by name across
+    batches; it learns this batch's once the batch commits.
+    """
+    with transaction.atomic():
+        names = resolve_categories(user, records, categories)
+        notes = Note.objects.bulk_create(
+            Note(
+                user=user,
+                title=record["title"],
+                content=record["content"],
+                content_hash=Note.hash_content(record["content"]),
+                category_id=names.get(record.get("category_name")),
+                priority=record["priority"],
+                is_pinned=record["is_pinned"],
+                is_archived=record["is_archived"],
+                tags=", ".join(record["tag_list"]),
+            )
+            for record in records
+        )
+        link_tags(user, notes)
+        counted = {note.category_id for note in notes if not note.is_archived}
+        Category.objects.filter(pk__in=counted - {None}).refresh_notes_count()
+        invalidate_stats(user.pk)
+        invalidate_responses(user.pk)
+        publish(
+            user.pk,
+            {
+                "type": "notes.bulk",
+                "operation": "import",
+                "ids": [note.pk for note in notes],
+            },
+        )
+    categories.update(names)
+    return notes
+
+
+def import_notes(user, records, batch_size=None, resume_from=0, progress=None):
+    """
+    Import ``records`` (from one of the readers above) as notes of ``user``.
+
+    Records are numbered from 1 in file order; the first ``resume_from`` are
+    skipped unread. Returns the number of records read (``records``, counting
+    skipped ones), notes ``imported``, invalid records ``skipped``, and
+    ``errors`` for up to NOTES_IMPORT_MAX_ERRORS of them. ``progress`` is
+    called with that summary after each committed batch. Raises
+    ImportInterrupted if the file or the database fails part way.
+    """
+    batch_size = batch_size or settings.NOTES_IMPORT_BATCH_SIZE
+    result = {"records": resume_from, "imported": 0, "skipped": 0, "errors": []}
+    categories = {}
+    batch = []
+    number = resume_from
+
+    def flush():
+        notes = write_batch(user, batch, categories)
+        result["imported"] += len(notes)
+        result["records"] = number
+        batch.clear()
+        if progress is not None:
+            progress(result)
+
+    try:
+        for number, record in enumerate(records, 1):
+            if number <= resume_from:
+                continue
+            if isinstance(record, MalformedRecord):
+                errors = {"non_field_errors": [record.message]}
+            else:
+                serializer = NoteImportSerializer(data=record)
+                errors = None if serializer.is_valid() else serializer.errors
+            if errors is not None:
+                result["skipped"] += 1
+                if len(result["errors"]) < settings.NOTES_IMPORT_MAX_ERRORS:
+                    result["errors"].append({"record": number, "errors": errors})
+                continue
+            batch.append(serializer.validated_data)
+            if len(batch) == batch_size:
+                flush()
+        if batch:
+            flush()
+        result["records"] = max(number, resume_from)
+    except DatabaseError as exc:
+        raise ImportInterrupted(exc, result) from exc
+    except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile) as exc:
+        raise ImportInterrupted(exc, result, status.HTTP_400_BAD_REQUEST) from exc
+    return result
@@ -0,0 +1,380 @@
+"""
+Request instrumentation: timing, query counts and query time per view action.
+
+``RequestMetricsMiddleware`` measures every request and records it in the
+process-wide ``registry``, labelled by URL name (``note-list``,
+``note-pinned``, ``signup``, ...) and viewset action (``list``, ``create``,
+...; the HTTP method for plain views). Each request is also logged to the
+``notes.requests`` logger with the measurements attached as record
+attributes (shown when NOTES_REQUEST_LOG is set), and ``metrics_view``
+serves the totals in the Prometheus text format at ``/api/metrics`` to
+clients with the NOTES_METRICS_TOKEN bearer token.
+
+Setting ``NOTES_METRICS_ENABLED = False`` removes the middleware from the
+stack at startup (``MiddlewareNotUsed``) and turns the metrics endpoint into
+a 404, so a disabled deployment does no per-request work at all.
+
+The middleware runs natively under both WSGI and ASGI. Queries are counted
+by an ``execute_wrapper`` installed on every database connection as it
+opens, which charges them to the request whose context made them, whichever
+thread they run in.
+
+Metrics are kept per process: with several workers, each reports its own.
+The bodies of streaming responses are written after the middleware returns,
+so queries made while streaming are not counted.
+"""
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger("notes.requests")
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_enabled():
+    return getattr(settings, "NOTES_METRICS_ENABLED", True)
+
+
+@dataclass
+class ActionMetrics:
+    requests: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    queries: int = 0
+    query_duration: float = 0.0
+    # One count per DURATION_BUCKETS bound, plus one for +Inf
+    buckets: list = field(default_factory=lambda: [0] * (len(DURATION_BUCKETS) + 1))
+    # Response cache lookups (see response_cache.py)
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+class MetricsRegistry:
+    """Thread-safe per-(view, action) request totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, view, action):
+        metrics = self._metrics.get((view, action))
+        if metrics is None:
+            metrics = self._metrics[(view, action)] = ActionMetrics()
+        return metrics
+
+    def record(self, view, action, status, duration, queries, query_duration):
+        with self._lock:
+            metrics = self._get(view, action)
+            metrics.requests += 1
+            metrics.errors += status >= 500
+            metrics.duration += duration
+            metrics.queries += queries
+            metrics.query_duration += query_duration
+            metrics.buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+
+    def record_cache(self, view, action, hit):
+        with self._lock:
+            metrics = self._get(view, action)
+            if hit:
+                metrics.cache_hits += 1
+            else:
+                metrics.cache_misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                labels: ActionMetrics(
+                    metrics.requests,
+                    metrics.errors,
+                    metrics.duration,
+                    metrics.queries,
+                    metrics.query_duration,
+                    list(metrics.buckets),
+                    metrics.cache_hits,
+                    metrics.cache_misses,
+                )
+                for labels, metrics in self._metrics.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def render_prometheus(self):
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        def labels(view, action, **extra):
+            pairs = {"view": view, "action": action, **extra}
+            return ",".join(
+                f'{key}="{_escape_label(value)}"' for key, value in pairs.items()
+            )
+
+        histogram = []
+        for (view, action), metrics in snapshot:
+            cumulative = 0
+            for bound, count in zip(
+                (*DURATION_BUCKETS, "+Inf"), metrics.buckets, strict=True
+            ):
+                cumulative += count
+                histogram.append(
+                    "notes_http_request_duration_seconds_bucket"
+                    f"{{{labels(view, action, le=str(bound))}}} {cumulative}"
+                )
+            histogram.append(
+                "notes_http_request_duration_seconds_sum"
+                f"{{{labels(view, action)}}} {metrics.duration:.6f}"
+            )
+            histogram.append(
+                "notes_http_request_duration_seconds_count"
+                f"{{{labels(view, action)}}} {metrics.requests}"
+            )
+        family(
+            "notes_http_request_duration_seconds",
+            "histogram",
+            "Time spent handling requests.",
+            histogram,
+        )
+        family(
+            "notes_http_requests_total",
+            "counter",
+            "Requests handled.",
+            [
+                f"notes_http_requests_total{{{labels(*key)}}} {metrics.requests}"
+                for key, metrics in snapshot
+            ],
+        )
+        family(
+            "notes_http_request_errors_total",
+            "counter",
+            "Requests answered with a 5xx status.",
+            [
+                f"notes_http_request_errors_total{{{labels(*key)}}} {metrics.errors}"
+                for key, metrics in snapshot
+            ],
+        )
+        family(
+            "notes_db_queries_total",
+            "counter",
+            "Database queries run while handling requests.",
+            [
+                f"notes_db_queries_total{{{labels(*key)}}} {metrics.queries}"
+                for key, metrics in snapshot
+            ],
+        )
+        family(
+            "notes_db_query_duration_seconds_total",
+            "counter",
+            "Time spent in database queries while handling requests.",
+            [
+                f"notes_db_query_duration_seconds_total{{{labels(*key)}}} "
+                f"{metrics.query_duration:.6f}"
+                for key, metrics in snapshot
+            ],
+        )
+        cached = [
+            (key, metrics)
+            for key, metrics in snapshot
+            if metrics.cache_hits or metrics.cache_misses
+        ]
+        family(
+            "notes_response_cache_hits_total",
+            "counter",
+            "Reads answered from the response cache.",
+            [
+                f"notes_response_cache_hits_total{{{labels(*key)}}} {metrics.cache_hits}"
+                for key, metrics in cached
+            ],
+        )
+        family(
+            "notes_response_cache_misses_total",
+            "counter",
+            "Cacheable reads that had to be built.",
+            [
+                f"notes_response_cache_misses_total{{{labels(*key)}}} "
+                f"{metrics.cache_misses}"
+                for key, metrics in cached
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """``execute_wrapper`` hook counting queries and the time spent in them."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# The QueryTimer of the request being handled in this context
+_request_timer = ContextVar("notes_request_timer", default=None)
+
+
+def count_request_queries(execute, sql, params, many, context):
+    """``execute_wrapper`` charging a query to the current request's timer."""
+    timer = _request_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """``connection_created`` receiver adding count_request_queries."""
+    if count_request_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_request_queries)
+
+
+def resolve_labels(request):
+    """The (view, action) labels for ``request``."""
+    match = request.resolver_match
+    if match is None:
+        return "unmatched", request.method.lower()
+    # Viewset routes map HTTP methods to actions; plain views use the method
+    actions = getattr(match.func, "actions", None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return match.view_name, action
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not metrics_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timer = QueryTimer()
+        token = _request_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = _request_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timer.reset(token)
+        self.record(request, response, time.perf_counter() - start, timer)
+        return response
+
+    def record(self, request, response, duration, timer):
+        view, action = resolve_labels(request)
+        registry.record(
+            view, action, response.status_code, duration, timer.count, timer.duration
+        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s %s %s %.1fms %d queries",
+                request.method,
+                view,
+                response.status_code,
+                duration * 1000,
+                timer.count,
+                extra={
+                    "view": view,
+                    "action": action,
+                    "method": request.method,
+                    "status": response.status_code,
+                    "duration_ms": round(duration * 1000, 3),
+                    "queries": timer.count,
+                    "query_ms": round(timer.duration * 1000, 3),
+                },
+            )
+
+
+class JSONLogFormatter(logging.Formatter):
+    """Format log records as one JSON object per line, request fields included."""
+
+    fields = (
+        "view",
+        "action",
+        "method",
+        "status",
+        "duration_ms",
+        "queries",
+        "query_ms",
+    )
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(
+            (name, getattr(record, name))
+            for name in self.fields
+            if hasattr(record, name)
+        )
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+def metrics_view(request):
+    """Serve the request metrics in the Prometheus text exposition format."""
+    if not metrics_enabled():
+        raise Http404
+    token = getattr(settings, "NOTES_METRICS_TOKEN", "")
+    if not token:
+        # Not readable by everyone by default: per-route latencies and counts
+        # say more about the deployment than it should share
+        raise Http404
+    if not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        registry.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE
+    )
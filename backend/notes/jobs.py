@@ -0,0 +1,185 @@
+"""
+A job queue in the database, for operations too long to run in a request.
+
+Views queue a Job with ``enqueue()`` and answer 202 with its id at once; the
+``run_jobs`` command claims queued jobs and runs them on a process pool, and
+``GET /api/jobs/{id}/`` reports their status and progress. There is no
+broker: the jobs table is the queue, so any number of workers can poll the
+same database.
+
+Handlers are registered per ``Job.kind`` with ``@register`` (see tasks.py).
+A handler receives the Job, may call ``job.report_progress()``, and returns
+the job's ``result``. Raising JobFailed fails the job at once; any other
+exception is retried after NOTES_JOBS_RETRY_DELAY seconds, doubling with
+each attempt, until ``max_attempts`` runs have failed.
+
+Claiming is a conditional UPDATE from ``queued`` to ``running``, so two
+workers never run the same job. While a job runs its worker refreshes
+``heartbeat_at``, from a side thread when it runs the job itself
+(``heartbeats()``); a running job whose heartbeat is older than
+NOTES_JOBS_STALE_AFTER seconds lost its worker and is retried like a failed
+one.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job.kind: (handler, max_attempts)
+HANDLERS = {}
+
+
+class JobFailed(Exception):
+    """Raised by a handler when running the job again would not help."""
+
+
+def register(kind, max_attempts=3):
+    """Register the decorated function as the handler of ``kind`` jobs."""
+
+    def decorator(handler):
+        HANDLERS[kind] = (handler, max_attempts)
+        return handler
+
+    return decorator
+
+
+def enqueue(kind, user=None, params=None, input_file=None):
+    """Queue a ``kind`` job; ``input_file`` is an uploaded file it reads."""
+    _, max_attempts = HANDLERS[kind]
+    job = Job(user=user, kind=kind, params=params or {}, max_attempts=max_attempts)
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    return job
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` due jobs as running and return their ids."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by(
+        "run_after", "pk"
+    )
+    claimed = []
+    for pk in due.values_list("pk", flat=True)[:limit]:
+        # Another worker may have claimed it since the SELECT
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def heartbeat(pks):
+    """Record that the jobs ``pks`` are still running."""
+    if pks:
+        Job.objects.filter(pk__in=pks, status=Job.RUNNING).update(
+            heartbeat_at=timezone.now()
+        )
+
+
+def heartbeat_interval():
+    """Seconds between heartbeats; a few per NOTES_JOBS_STALE_AFTER."""
+    return settings.NOTES_JOBS_STALE_AFTER / 5
+
+
+@contextmanager
+def heartbeats(pks):
+    """Send the heartbeats of the jobs ``pks`` from a thread while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(heartbeat_interval()):
+                heartbeat(pks)
+        finally:
+            # Threads do not get request_finished to close theirs
+            connection.close()
+
+    thread = threading.Thread(target=beat, name="notes-job-heartbeat", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def retry_or_fail_fields(job, error):
+    """The fields that queue ``job`` to run again after a backoff, or fail it."""
+    if job.attempts < job.max_attempts:
+        delay = settings.NOTES_JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+        return {
+            "status": Job.QUEUED,
+            "error": error,
+            "run_after": timezone.now() + timedelta(seconds=delay),
+        }
+    return {"status": Job.FAILED, "error": error, "finished_at": timezone.now()}
+
+
+def retry_or_fail(job, error):
+    """Queue ``job`` to run again after a backoff, or fail it for good."""
+    fields = retry_or_fail_fields(job, error)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=fields)
+
+
+def requeue_stale():
+    """Retry or fail running jobs whose worker stopped sending heartbeats."""
+    cutoff = timezone.now() - timedelta(seconds=settings.NOTES_JOBS_STALE_AFTER)
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+    requeued = 0
+    for job in stale:
+        fields = retry_or_fail_fields(job, "The worker running the job stopped.")
+        # The job may have finished, or another worker requeued it, since
+        # the SELECT
+        requeued += stale.filter(pk=job.pk).update(**fields)
+    return requeued
+
+
+def run_job(pk):
+    """Run the claimed job ``pk`` and store its outcome. Returns its status."""
+    job = Job.objects.get(pk=pk)
+    handler, _ = HANDLERS[job.kind]
+    try:
+        result = handler(job)
+    except JobFailed as exc:
+        job.status = Job.FAILED
+        job.error = str(exc)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+    except Exception as exc:
+        # The traceback goes to the log; users see the exception's summary
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        retry_or_fail(job, f"{type(exc).__name__}: {exc}")
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.error = ""
+        job.finished_at = timezone.now()
+        job.save(
+            update_fields=["status", "result", "error", "output_file", "finished_at"]
+        )
+    return job.status
+
+
+def run_job_in_worker(pk):
+    """``run_job()`` in a pool process, around which no request cycle runs."""
+    close_old_connections()
+    try:
+        return run_job(pk)
+    finally:
+        close_old_connections()
@@ -0,0 +1,81 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notes.authentication import CachedJWTAuthentication, token_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare simplejwt's JWTAuthentication with CachedJWTAuthentication "
+        "on requests that repeat a few access tokens, as clients do."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=10000)
+        parser.add_argument(
+            "--users", type=int, default=10, help="Distinct users (and tokens)."
+        )
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        prefix = f"benchmark-auth-{uuid.uuid4().hex}"
+        users = [
+            User.objects.create_user(username=f"{prefix}-{index}")
+            for index in range(options["users"])
+        ]
+        try:
+            factory = APIRequestFactory()
+            headers = [f"Bearer {AccessToken.for_user(user)}" for user in users]
+            requests = [
+                Request(
+                    factory.get(
+                        "/api/notes/",
+                        HTTP_AUTHORIZATION=headers[index % len(headers)],
+                    )
+                )
+                for index in range(options["requests"])
+            ]
+            self.stdout.write(
+                f"{len(requests)} requests, {len(users)} tokens, "
+                f"best of {options['rounds']} rounds"
+            )
+            self.stdout.write(f"{'class':<24}{'ms':>10}{'req/s':>12}{'queries':>10}")
+            for authentication in (JWTAuthentication(), CachedJWTAuthentication()):
+                results = [
+                    self.time_round(requests, authentication)
+                    for _ in range(options["rounds"])
+                ]
+                best, queries = min(results)
+                self.stdout.write(
+                    f"{type(authentication).__name__:<24}{best * 1000:>10.1f}"
+                    f"{len(requests) / best:>12.0f}{queries:>10}"
+                )
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    @staticmethod
+    def time_round(requests, authentication):
+        # Each round starts cold, so it includes the first verification of
+        # each token
+        token_cache.clear()
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            start = time.perf_counter()
+            for request in requests:
+                authentication.authenticate(request)
+            elapsed = time.perf_counter() - start
+        return elapsed, queries
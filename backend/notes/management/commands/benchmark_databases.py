@@ -0,0 +1,223 @@
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notes.models import Category, Note
+
+# Environment of each mode, on top of DATABASE_URL (see
+# notes_backend/database.py)
+SQLITE_MODES = {
+    # Django's defaults, and this project's settings before database.py
+    "sqlite": {
+        "DATABASE_CONN_MAX_AGE": "0",
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_TRANSACTION_MODE": "deferred",
+    },
+    "sqlite-persistent": {
+        "DATABASE_CONN_MAX_AGE": "60",
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_TRANSACTION_MODE": "deferred",
+    },
+    # The defaults of database.py
+    "sqlite-wal": {},
+}
+POSTGRES_MODES = {
+    "postgres": {"DATABASE_CONN_MAX_AGE": "0"},
+    "postgres-persistent": {"DATABASE_CONN_MAX_AGE": "60"},
+    "postgres-pool": {"DATABASE_POOL": "1"},
+}
+
+
+def run_wsgi(requests, authorization, concurrency):
+    """Time each ``(method, path, body)`` through the WSGI handler."""
+    handler = WSGIHandler()
+
+    def request(method, path, body):
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": authorization,
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - start, statuses[0][:1] == "2"
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda args: request(*args), requests))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second under each database mode: SQLite with "
+        "Django's defaults, with persistent connections, and in WAL mode with "
+        "this project's pragmas; with --postgres, also PostgreSQL with and "
+        "without persistent connections and with a connection pool. Requests "
+        "mix note reads and creates and go straight to the WSGI handler, each "
+        "mode in its own process and SQLite modes on a fresh database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--writes",
+            type=float,
+            default=0.2,
+            help="Share of requests that create a note.",
+        )
+        parser.add_argument(
+            "--postgres",
+            metavar="DATABASE_URL",
+            help="A PostgreSQL database to benchmark as well; it is migrated.",
+        )
+        # Used by the per-mode child processes
+        parser.add_argument("--mode", help="Run one mode.")
+
+    def handle(self, *args, **options):
+        if options["mode"]:
+            self.run_mode(options)
+            return
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, env in SQLITE_MODES.items():
+                url = f"sqlite:///{os.path.join(directory, mode)}.sqlite3"
+                results[mode] = self.spawn(mode, {**env, "DATABASE_URL": url}, options)
+        if options["postgres"]:
+            for mode, env in POSTGRES_MODES.items():
+                results[mode] = self.spawn(
+                    mode, {**env, "DATABASE_URL": options["postgres"]}, options
+                )
+
+        self.stdout.write(
+            f"{options['requests']} requests ({options['writes']:.0%} writes), "
+            f"concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"{'mode':<21}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<21}{result['throughput']:>10.1f}"
+                f"{result['p50'] * 1000:>10.2f}{result['p99'] * 1000:>10.2f}"
+                f"{result['errors']:>8}"
+            )
+
+    def spawn(self, mode, env, options):
+        # Each mode sets its own; none may leak in from this process
+        environ = {
+            name: value
+            for name, value in os.environ.items()
+            if not name.startswith(("DATABASE_", "SQLITE_"))
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "django",
+            "benchmark_databases",
+            f"--mode={mode}",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+            f"--writes={options['writes']}",
+        ]
+        completed = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env={**environ, **env},
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{mode} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_mode(self, options):
+        # One log line per request would dominate the measurement
+        logging.getLogger("notes.requests").setLevel(logging.WARNING)
+        call_command("migrate", verbosity=0)
+        user = User.objects.create_user(username=f"db-benchmark-{uuid.uuid4().hex}")
+        try:
+            category = Category.objects.create(user=user, name="Benchmark")
+            note_ids = [
+                note.pk
+                for note in Note.objects.bulk_create(
+                    Note(
+                        user=user,
+                        title=f"Benchmark note {index}",
+                        content="Lorem ipsum dolor sit amet. " * 40,
+                        category=category,
+                    )
+                    for index in range(200)
+                )
+            ]
+            authorization = f"Bearer {AccessToken.for_user(user)}"
+            concurrency = options["concurrency"]
+            rng = random.Random(0)
+            body = json.dumps(
+                {"title": "New note", "content": "Benchmark", "category": category.pk}
+            ).encode()
+
+            def requests(count):
+                for _ in range(count):
+                    if rng.random() < options["writes"]:
+                        yield "POST", "/api/notes/", body
+                    elif rng.random() < 0.5:
+                        yield "GET", "/api/notes/", b""
+                    else:
+                        note = rng.choice(note_ids)
+                        yield "GET", f"/api/notes/{note}/", b""
+
+            # Cached read responses would never reach the database
+            with override_settings(NOTES_RESPONSE_CACHE_TIMEOUT=0):
+                run_wsgi(list(requests(concurrency)), authorization, concurrency)
+                start = time.perf_counter()
+                timings = run_wsgi(
+                    list(requests(options["requests"])), authorization, concurrency
+                )
+                elapsed = time.perf_counter() - start
+        finally:
+            user.delete()
+
+        durations = sorted(duration for duration, _ok in timings)
+        self.stdout.write(
+            json.dumps(
+                {
+                    "throughput": len(timings) / elapsed,
+                    "p50": statistics.median(durations),
+                    "p99": durations[int(len(durations) * 0.99) - 1],
+                    "errors": sum(not ok for _duration, ok in timings),
+                }
+            )
+        )
@@ -0,0 +1,235 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from notes.models import Category, Note
+
+# asgi-async is asgi.py with NOTES_ASYNC_READS on
+INTERFACES = ("wsgi", "asgi", "asgi-async")
+
+
+def read_paths(user, count):
+    """``count`` GET paths cycling through the note read actions."""
+    note_ids = list(Note.objects.filter(user=user).values_list("pk", flat=True))
+    paths = [
+        "/api/notes/",
+        "/api/notes/{note}/",
+        "/api/notes/pinned/",
+        "/api/notes/archived/",
+        "/api/notes/stats/",
+    ]
+    return [
+        paths[index % len(paths)].format(note=note_ids[index % len(note_ids)])
+        for index in range(count)
+    ]
+
+
+def run_wsgi(paths, authorization, concurrency):
+    """Time each request through the WSGI handler from ``concurrency`` threads."""
+    handler = WSGIHandler()
+
+    def request(path):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": authorization,
+            "wsgi.input": io.BytesIO(),
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - start, statuses[0].startswith("200")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(request, paths))
+
+
+async def run_asgi(paths, authorization, concurrency):
+    """Time each request through the ASGI handler, ``concurrency`` at a time."""
+    handler = ASGIHandler()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request(path):
+        done = asyncio.Event()
+        status = []
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif not message.get("more_body", False):
+                done.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"authorization", authorization.encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        async with slots:
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - start, status[0] == 200
+
+    return await asyncio.gather(*(request(path) for path in paths))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare note read throughput and latency through wsgi.py, asgi.py, and "
+        "asgi.py with NOTES_ASYNC_READS. Requests go straight to the in-process handlers (no server or "
+        "network), each interface in its own process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument(
+            "--notes", type=int, default=200, help="Notes owned by the test user."
+        )
+        # Used by the per-interface child processes
+        parser.add_argument("--interface", choices=INTERFACES, help="Run one side.")
+        parser.add_argument("--user", type=int, help="Benchmark an existing user.")
+
+    def handle(self, *args, **options):
+        if options["interface"]:
+            self.run_interface(options)
+            return
+
+        user = User.objects.create_user(username=f"read-benchmark-{uuid.uuid4().hex}")
+        try:
+            category = Category.objects.create(user=user, name="Benchmark")
+            Note.objects.bulk_create(
+                Note(
+                    user=user,
+                    title=f"Benchmark note {index}",
+                    content="Lorem ipsum dolor sit amet. " * 40,
+                    category=category,
+                    is_pinned=index % 10 == 0,
+                    is_archived=index % 7 == 0,
+                )
+                for index in range(options["notes"])
+            )
+            results = {
+                interface: self.spawn(interface, user, options)
+                for interface in INTERFACES
+            }
+        finally:
+            user.delete()
+
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"{'interface':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for interface, result in results.items():
+            self.stdout.write(
+                f"{interface:<12}{result['throughput']:>10.1f}"
+                f"{result['p50'] * 1000:>10.2f}{result['p99'] * 1000:>10.2f}"
+                f"{result['errors']:>8}"
+            )
+
+    def spawn(self, interface, user, options):
+        env = {
+            **os.environ,
+            "NOTES_ASYNC_READS": "1" if interface == "asgi-async" else "0",
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "django",
+            "benchmark_reads",
+            f"--interface={interface}",
+            f"--user={user.pk}",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+        ]
+        completed = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{interface} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_interface(self, options):
+        # One log line per request would dominate the measurement
+        logging.getLogger("notes.requests").setLevel(logging.WARNING)
+        user = User.objects.get(pk=options["user"])
+        authorization = f"Bearer {AccessToken.for_user(user)}"
+        concurrency = options["concurrency"]
+
+        if options["interface"] == "wsgi":
+            run_wsgi(read_paths(user, concurrency), authorization, concurrency)
+            start = time.perf_counter()
+            timings = run_wsgi(
+                read_paths(user, options["requests"]), authorization, concurrency
+            )
+        else:
+            asyncio.run(
+                run_asgi(read_paths(user, concurrency), authorization, concurrency)
+            )
+            start = time.perf_counter()
+            timings = asyncio.run(
+                run_asgi(
+                    read_paths(user, options["requests"]), authorization, concurrency
+                )
+            )
+        elapsed = time.perf_counter() - start
+
+        durations = sorted(duration for duration, _ok in timings)
+        self.stdout.write(
+            json.dumps(
+                {
+                    "throughput": len(timings) / elapsed,
+                    "p50": statistics.median(durations),
+                    "p99": durations[int(len(durations) * 0.99) - 1],
+                    "errors": sum(not ok for _duration, ok in timings),
+                }
+            )
+        )
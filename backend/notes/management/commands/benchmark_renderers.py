@@ -0,0 +1,76 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from notes.renderers import FastJSONRenderer, orjson
+from notes.serializers import NoteListSerializer
+from notes.streaming import json_array_chunks
+
+from .benchmark_serializers import load_benchmark_notes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer with FastJSONRenderer on a list of "
+        "serialized notes, rendered whole and streamed, and check that both "
+        "produce the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notes", type=int, default=10000)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument(
+            "--fields",
+            help="Comma-separated fields to serialize (default: the list defaults).",
+        )
+
+    def handle(self, *args, **options):
+        fields = (
+            options["fields"].split(",")
+            if options["fields"]
+            else [
+                field
+                for field in NoteListSerializer.Meta.fields
+                if field not in NoteListSerializer.opt_in_fields
+            ]
+        )
+        notes = load_benchmark_notes(options["notes"])
+        data = NoteListSerializer(notes, many=True, fields=fields).data
+
+        def whole(renderer):
+            return lambda: renderer.render(data)
+
+        def streamed(renderer):
+            return lambda: b"".join(
+                json_array_chunks(data, lambda item: item, renderer=renderer)
+            )
+
+        paths = {
+            "JSONRenderer": whole(JSONRenderer()),
+            "FastJSONRenderer": whole(FastJSONRenderer()),
+            "JSONRenderer, streamed": streamed(JSONRenderer()),
+            "FastJSONRenderer, streamed": streamed(FastJSONRenderer()),
+        }
+        outputs = {path: render() for path, render in paths.items()}
+        if len(set(outputs.values())) != 1:
+            raise CommandError("The renderers' outputs differ.")
+        size = len(outputs["JSONRenderer"])
+
+        self.stdout.write(
+            f"{len(data)} notes, {size / 1e6:.1f} MB of JSON, "
+            f"best of {options['rounds']} rounds, "
+            f"orjson {orjson.__version__ if orjson else 'not installed'}"
+        )
+        self.stdout.write(f"{'path':<28}{'ms':>10}{'MB/s':>10}")
+        for path, render in paths.items():
+            best = min(self.time_round(render) for _ in range(options["rounds"]))
+            self.stdout.write(
+                f"{path:<28}{best * 1000:>10.1f}{size / best / 1e6:>10.0f}"
+            )
+
+    @staticmethod
+    def time_round(render):
+        start = time.perf_counter()
+        render()
+        return time.perf_counter() - start
@@ -0,0 +1,110 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import Substr
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from notes.models import Category, Note
+from notes.serializers import NoteListSerializer
+from notes.views import CONTENT_PREVIEW_LENGTH
+
+
+def generic_representation(serializer, instance):
+    """What DRF's Serializer.to_representation() makes of ``instance``."""
+    return serializers.Serializer.to_representation(serializer, instance)
+
+
+def load_benchmark_notes(count):
+    """
+    ``count`` notes as the list view loads them, for a throwaway user whose
+    rows are deleted again before returning.
+    """
+    user = User.objects.create_user(username=f"benchmark-notes-{uuid.uuid4().hex}")
+    try:
+        categories = [
+            Category.objects.create(user=user, name=f"Benchmark {index}")
+            for index in range(5)
+        ]
+        Note.objects.bulk_create(
+            Note(
+                user=user,
+                title=f"Benchmark note {index}",
+                content="Lorem ipsum dolor sit amet. " * 40,
+                # Every sixth note is uncategorized
+                category=categories[index % 6] if index % 6 < 5 else None,
+                tags=", ".join(f"tag{tag}" for tag in range(index % 4)),
+                is_pinned=index % 10 == 0,
+            )
+            for index in range(count)
+        )
+        notes = list(
+            Note.objects.filter(user=user)
+            .select_related("category")
+            .annotate(content_preview=Substr("content", 1, CONTENT_PREVIEW_LENGTH))
+        )
+    finally:
+        user.delete()
+    return notes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare NoteListSerializer's compiled representation with DRF's "
+        "generic one on a list of notes, and check that both render the same "
+        "JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--notes", type=int, default=10000)
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument(
+            "--fields",
+            help="Comma-separated fields to serialize (default: the list defaults).",
+        )
+
+    def handle(self, *args, **options):
+        fields = (
+            options["fields"].split(",")
+            if options["fields"]
+            else [
+                field
+                for field in NoteListSerializer.Meta.fields
+                if field not in NoteListSerializer.opt_in_fields
+            ]
+        )
+        notes = load_benchmark_notes(options["notes"])
+
+        serializer = NoteListSerializer(fields=fields)
+        renderer = JSONRenderer()
+        compiled = renderer.render([serializer.to_representation(n) for n in notes])
+        generic = renderer.render(
+            [generic_representation(serializer, n) for n in notes]
+        )
+        if compiled != generic:
+            raise CommandError("The compiled and generic representations differ.")
+
+        self.stdout.write(
+            f"{len(notes)} notes, {len(serializer.fields)} fields, "
+            f"best of {options['rounds']} rounds"
+        )
+        self.stdout.write(f"{'path':<10}{'ms':>10}{'notes/s':>12}")
+        for path, represent in (
+            ("generic", lambda note: generic_representation(serializer, note)),
+            ("compiled", serializer.to_representation),
+        ):
+            best = min(
+                self.time_round(notes, represent) for _ in range(options["rounds"])
+            )
+            self.stdout.write(
+                f"{path:<10}{best * 1000:>10.1f}{len(notes) / best:>12.0f}"
+            )
+
+    @staticmethod
+    def time_round(notes, represent):
+        start = time.perf_counter()
+        for note in notes:
+            represent(note)
+        return time.perf_counter() - start
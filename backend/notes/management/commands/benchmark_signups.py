@@ -0,0 +1,219 @@
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+INTERFACES = ("wsgi", "asgi")
+PATH = "/api/auth/signup/"
+
+
+def signup_bodies(prefix, start, count):
+    return [
+        json.dumps(
+            {"email": f"{prefix}-{index}@example.com", "password": "benchmark-pass"}
+        ).encode()
+        for index in range(start, start + count)
+    ]
+
+
+def run_wsgi(bodies, concurrency):
+    """Time each signup through the WSGI handler from ``concurrency`` threads."""
+    handler = WSGIHandler()
+
+    def request(body):
+        environ = {
+            "REQUEST_METHOD": "POST",
+            "PATH_INFO": PATH,
+            "QUERY_STRING": "",
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - start, statuses[0].startswith("201")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(request, bodies))
+
+
+async def run_asgi(bodies, concurrency):
+    """Time each signup through the ASGI handler, ``concurrency`` at a time."""
+    handler = ASGIHandler()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request(body):
+        done = asyncio.Event()
+        status = []
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif not message.get("more_body", False):
+                done.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": PATH,
+            "raw_path": PATH.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+        async with slots:
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - start, status[0] == 201
+
+    return await asyncio.gather(*(request(body) for body in bodies))
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure signups per second through wsgi.py and asgi.py, at one or "
+        "more PBKDF2 iteration counts. Requests go straight to the in-process "
+        "handlers (no server or network), each run in its own process. The "
+        "users it creates are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--signups", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            nargs="+",
+            default=[settings.NOTES_PASSWORD_ITERATIONS, 100_000],
+            help="NOTES_PASSWORD_ITERATIONS values to compare.",
+        )
+        # Used by the per-run child processes
+        parser.add_argument("--interface", choices=INTERFACES, help="Run one side.")
+        parser.add_argument("--prefix", help="Email prefix of the new users.")
+
+    def handle(self, *args, **options):
+        if options["interface"]:
+            self.run_interface(options)
+            return
+
+        prefix = f"signup-benchmark-{uuid.uuid4().hex}"
+        try:
+            results = {
+                (interface, iterations): self.spawn(
+                    interface, iterations, f"{prefix}-{interface}-{iterations}", options
+                )
+                for iterations in options["iterations"]
+                for interface in INTERFACES
+            }
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+        self.stdout.write(
+            f"{options['signups']} signups, concurrency {options['concurrency']}, "
+            f"{os.cpu_count()} CPUs"
+        )
+        self.stdout.write(
+            f"{'interface':<10}{'iterations':>12}{'signups/s':>11}"
+            f"{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for (interface, iterations), result in results.items():
+            self.stdout.write(
+                f"{interface:<10}{iterations:>12}{result['throughput']:>11.1f}"
+                f"{result['p50'] * 1000:>10.1f}{result['p99'] * 1000:>10.1f}"
+                f"{result['errors']:>8}"
+            )
+
+    def spawn(self, interface, iterations, prefix, options):
+        env = {
+            **os.environ,
+            "NOTES_PASSWORD_POOL": "1" if interface == "asgi" else "0",
+            "NOTES_PASSWORD_ITERATIONS": str(iterations),
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "django",
+            "benchmark_signups",
+            f"--interface={interface}",
+            f"--prefix={prefix}",
+            f"--signups={options['signups']}",
+            f"--concurrency={options['concurrency']}",
+        ]
+        completed = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"{interface} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run_interface(self, options):
+        # One log line per request would dominate the measurement
+        logging.getLogger("notes.requests").setLevel(logging.WARNING)
+        prefix = options["prefix"]
+        concurrency = options["concurrency"]
+        warmup = signup_bodies(f"{prefix}-warmup", 0, concurrency)
+        bodies = signup_bodies(prefix, 0, options["signups"])
+
+        if options["interface"] == "wsgi":
+            run_wsgi(warmup, concurrency)
+            start = time.perf_counter()
+            timings = run_wsgi(bodies, concurrency)
+        else:
+            asyncio.run(run_asgi(warmup, concurrency))
+            start = time.perf_counter()
+            timings = asyncio.run(run_asgi(bodies, concurrency))
+        elapsed = time.perf_counter() - start
+
+        durations = sorted(duration for duration, _ok in timings)
+        self.stdout.write(
+            json.dumps(
+                {
+                    "throughput": len(timings) / elapsed,
+                    "p50": statistics.median(durations),
+                    "p99": durations[max(int(len(durations) * 0.99) - 1, 0)],
+                    "errors": sum(not ok for _duration, ok in timings),
+                }
+            )
+        )
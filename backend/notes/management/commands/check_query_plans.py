@@ -0,0 +1,238 @@
+import re
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from notes.models import Category, Note, Tombstone
+from notes.pagination import NoteKeysetPagination
+from notes.sync import notes_after
+from notes.views import CategoryViewSet, NoteViewSet
+
+CHECKED_TABLES = "notes_note|notes_category|notes_notetag|notes_tag|notes_tombstone"
+
+# SQLite reports full scans as "SCAN <table>" (virtual FTS tables are named
+# notes_note_fts and do not match) and sorts as "USE TEMP B-TREE".
+SQLITE_FULL_SCAN = re.compile(rf"\bSCAN ({CHECKED_TABLES})\b")
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE")
+POSTGRES_FULL_SCAN = re.compile(rf"Seq Scan on ({CHECKED_TABLES})\b")
+POSTGRES_SORT = re.compile(r"\bSort\s+\(")
+
+
+@dataclass
+class QueryShape:
+    name: str
+    viewset: type
+    action: str = "list"
+    params: dict = field(default_factory=dict)
+    # Builds the queryset from the view; defaults to what list/retrieve run
+    queryset: object = None
+    # Shapes whose ordering cannot come from an index (relevance, title, ...)
+    allow_sort: bool = False
+
+
+def filtered(view):
+    return view.filter_queryset(view.get_queryset())
+
+
+def retrieved(view):
+    # get_object() ends in QuerySet.get(), which drops the ordering
+    return filtered(view).filter(pk=1).order_by()
+
+
+def keyset_page(view):
+    """A page after the first one, as NoteKeysetPagination fetches it."""
+    paginator = NoteKeysetPagination()
+    queryset = filtered(view).order_by(*paginator.ordering)
+    position = (True, timezone.now(), 1)
+    return queryset.filter(paginator.after(queryset, position))[
+        : paginator.page_size + 1
+    ]
+
+
+def sync_page(view):
+    """Notes after a sync cursor, as get_changes() fetches them."""
+    queryset = notes_after(view.get_queryset(), (timezone.now(), 1))
+    return queryset[: settings.NOTES_SYNC_PAGE_SIZE + 1]
+
+
+QUERY_SHAPES = [
+    QueryShape("notes: list", NoteViewSet),
+    QueryShape("notes: list active", NoteViewSet, params={"is_archived": "false"}),
+    QueryShape(
+        "notes: list active in category",
+        NoteViewSet,
+        params={"is_archived": "false", "category": "{category}"},
+    ),
+    QueryShape(
+        "notes: list in category", NoteViewSet, params={"category": "{category}"}
+    ),
+    QueryShape("notes: list pinned filter", NoteViewSet, params={"is_pinned": "true"}),
+    QueryShape("notes: list by priority", NoteViewSet, params={"priority": "high"}),
+    QueryShape("notes: list by tags", NoteViewSet, params={"tags": "plan-check"}),
+    QueryShape(
+        "notes: list by any tag",
+        NoteViewSet,
+        params={"tags": "plan-check", "tags_match": "any"},
+    ),
+    QueryShape(
+        "notes: search",
+        NoteViewSet,
+        params={"search": "plan check"},
+        allow_sort=True,
+    ),
+    QueryShape(
+        "notes: list ordered by title",
+        NoteViewSet,
+        params={"ordering": "title"},
+        allow_sort=True,
+    ),
+    QueryShape(
+        "notes: retrieve",
+        NoteViewSet,
+        action="retrieve",
+        queryset=retrieved,
+    ),
+    QueryShape(
+        "notes: archived",
+        NoteViewSet,
+        action="archived",
+        queryset=lambda view: view.get_queryset().filter(is_archived=True),
+    ),
+    QueryShape(
+        "notes: pinned",
+        NoteViewSet,
+        action="pinned",
+        queryset=lambda view: view.get_queryset().filter(is_pinned=True),
+    ),
+    QueryShape("notes: cursor page", NoteViewSet, queryset=keyset_page),
+    QueryShape(
+        "notes: cursor page active",
+        NoteViewSet,
+        params={"is_archived": "false"},
+        queryset=keyset_page,
+    ),
+    QueryShape(
+        "notes: cursor page in category",
+        NoteViewSet,
+        params={"category": "{category}"},
+        queryset=keyset_page,
+    ),
+    QueryShape("notes: sync", NoteViewSet, action="sync", queryset=sync_page),
+    QueryShape(
+        "categories: sync",
+        NoteViewSet,
+        action="sync",
+        queryset=lambda view: Category.objects.filter(
+            user=view.request.user, updated_at__gte=timezone.now()
+        ).order_by("updated_at"),
+    ),
+    QueryShape(
+        "tombstones: sync",
+        NoteViewSet,
+        action="sync",
+        queryset=lambda view: Tombstone.objects.filter(
+            user=view.request.user, deleted_at__gte=timezone.now()
+        ).order_by("deleted_at"),
+    ),
+    QueryShape("categories: list", CategoryViewSet),
+    QueryShape(
+        "categories: list by creation",
+        CategoryViewSet,
+        params={"ordering": "-created_at"},
+    ),
+    QueryShape("categories: search", CategoryViewSet, params={"search": "pla"}),
+    QueryShape(
+        "categories: retrieve",
+        CategoryViewSet,
+        action="retrieve",
+        queryset=retrieved,
+    ),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every NoteViewSet and CategoryViewSet query shape and fail if "
+        "any of them needs a full table scan or a sort that an index should serve."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to check the query plans on.",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor == "sqlite":
+            full_scan, sort = SQLITE_FULL_SCAN, SQLITE_SORT
+        elif connection.vendor == "postgresql":
+            full_scan, sort = POSTGRES_FULL_SCAN, POSTGRES_SORT
+        else:
+            raise CommandError(f"Unsupported database vendor: {connection.vendor}")
+
+        failures = 0
+        # Plans are taken against throwaway rows that are rolled back afterwards
+        with transaction.atomic(using=connection.alias):
+            if connection.vendor == "postgresql":
+                # Small tables make sequential scans and sorts look cheap;
+                # penalising them shows whether an index could serve the query.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+                    cursor.execute("SET LOCAL enable_sort = off")
+            user = User.objects.create_user(username="query-plan-check")
+            category = Category.objects.create(user=user, name="Plan check")
+            Note.objects.create(
+                user=user, title="Plan check", category=category, tags="plan-check"
+            )
+
+            for shape in QUERY_SHAPES:
+                queryset = self.build_queryset(shape, user, category)
+                plan = queryset.using(connection.alias).explain()
+                problems = []
+                if full_scan.search(plan):
+                    problems.append("full table scan")
+                if sort.search(plan) and not shape.allow_sort:
+                    problems.append("sort not served by an index")
+
+                if problems:
+                    failures += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"FAIL {shape.name}: {', '.join(problems)}")
+                    )
+                    self.stdout.write(plan)
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK   {shape.name}"))
+                    if options["verbosity"] > 1:
+                        self.stdout.write(plan)
+
+            transaction.set_rollback(True, using=connection.alias)
+
+        if failures:
+            raise CommandError(f"{failures} query shape(s) have inefficient plans.")
+
+    def build_queryset(self, shape, user, category):
+        params = {
+            key: value.format(category=category.pk)
+            for key, value in shape.params.items()
+        }
+        request = Request(APIRequestFactory().get("/", params))
+        request.user = user
+
+        view = shape.viewset()
+        view.request = request
+        view.action = shape.action
+        view.args = ()
+        view.kwargs = {}
+        view.format_kwarg = None
+
+        if shape.queryset is not None:
+            return shape.queryset(view)
+        return filtered(view)[: view.paginator.page_size]
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.imports import (
+    IMPORT_FORMATS,
+    ImportInterrupted,
+    format_for_filename,
+    import_notes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import notes for a user from a JSON Lines, CSV or Markdown zip file, "
+        "as written by the export action."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument(
+            "--user", required=True, help="Username of the notes' owner."
+        )
+        parser.add_argument(
+            "--format",
+            choices=[*IMPORT_FORMATS],
+            help="File format; defaults to the one the file name suggests.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Notes inserted per transaction (default NOTES_IMPORT_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--resume-from",
+            type=int,
+            default=0,
+            help="Skip this many records, as reported by an interrupted import.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist as exc:
+            raise CommandError(f"No user named {options['user']!r}.") from exc
+        import_format = options["format"] or format_for_filename(options["path"])
+        if import_format is None:
+            raise CommandError("Cannot tell the file's format; pass --format.")
+
+        def progress(result):
+            self.stdout.write(
+                f"Record {result['records']}: {result['imported']} imported, "
+                f"{result['skipped']} skipped"
+            )
+
+        try:
+            with open(options["path"], "rb") as file:
+                result = import_notes(
+                    user,
+                    IMPORT_FORMATS[import_format](file),
+                    batch_size=options["batch_size"],
+                    resume_from=options["resume_from"],
+                    progress=progress,
+                )
+        except OSError as exc:
+            raise CommandError(exc) from exc
+        except ImportInterrupted as exc:
+            raise CommandError(
+                f"{exc.detail['detail']} Run again with "
+                f"--resume-from {exc.result['records']} to continue."
+            ) from exc
+
+        for error in result["errors"]:
+            self.stderr.write(f"Record {error['record']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result['imported']} notes from {result['records']} "
+                f"records ({result['skipped']} skipped)."
+            )
+        )
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete background jobs that finished more than NOTES_JOBS_KEEP_DAYS "
+        "ago, with their files."
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.NOTES_JOBS_KEEP_DAYS)
+        jobs = Job.objects.filter(
+            status__in=[Job.SUCCEEDED, Job.FAILED], finished_at__lt=cutoff
+        )
+        deleted = 0
+        for job in jobs.iterator():
+            # Deleting rows leaves their files behind
+            job.input_file.delete(save=False)
+            job.output_file.delete(save=False)
+            job.delete()
+            deleted += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} jobs."))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than NOTES_SYNC_TOMBSTONE_DAYS; sync "
+        "refuses cursors that old anyway."
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.NOTES_SYNC_TOMBSTONE_DAYS)
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from notes.jobs import enqueue
+from notes.search import ensure_search_index, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search index for notes and repopulate it."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to rebuild the index on.",
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue the rebuild for the run_jobs worker instead.",
+        )
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        if options["background"]:
+            job = enqueue("reindex", params={"database": alias})
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.pk}."))
+            return
+        ensure_search_index(connections[alias], rebuild=True)
+        backend = get_search_backend(alias)
+        self.stdout.write(
+            self.style.SUCCESS(f"Search index rebuilt ({type(backend).__name__}).")
+        )
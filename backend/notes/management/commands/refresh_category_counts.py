@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import Category
+
+
+class Command(BaseCommand):
+    help = "Recompute every category's denormalized active_notes_count."
+
+    def handle(self, *args, **options):
+        corrected = Category.objects.refresh_notes_count()
+        self.stdout.write(self.style.SUCCESS(f"Corrected {corrected} categories."))
@@ -0,0 +1,127 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes.jobs import (
+    claim_jobs,
+    heartbeat,
+    heartbeat_interval,
+    heartbeats,
+    requeue_stale,
+    retry_or_fail,
+    run_job,
+    run_job_in_worker,
+)
+from notes.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (exports, imports, bulk operations, "
+        "reindexing) on a pool of processes, until stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.NOTES_JOBS_PROCESSES,
+            help="Jobs run at once, each in its own process. 0 runs them one at "
+            "a time in this process.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due instead of waiting for more.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.NOTES_JOBS_POLL_INTERVAL,
+            help="Seconds between queue scans while idle.",
+        )
+
+    def handle(self, *args, **options):
+        self.once = options["once"]
+        self.poll_interval = options["poll_interval"]
+        processes = options["processes"]
+        if processes == 0:
+            self.run_inline()
+            return
+        while True:
+            # Spawned processes share nothing, database connections included,
+            # with this one. They load the apps (and with them the job
+            # handlers in tasks.py) before unpickling any job.
+            with ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            ) as pool:
+                try:
+                    self.run_pool(pool, processes)
+                    return
+                except BrokenProcessPool:
+                    self.stderr.write("A job process died; restarting the pool.")
+
+    def run_inline(self):
+        while True:
+            requeue_stale()
+            claimed = claim_jobs(1)
+            if claimed:
+                # This thread is busy with the job for as long as it runs
+                with heartbeats(claimed):
+                    status = run_job(claimed[0])
+                self.report(claimed[0], status)
+            elif self.once:
+                return
+            else:
+                time.sleep(self.poll_interval)
+
+    def run_pool(self, pool, processes):
+        running = {}
+        # Stale checks and heartbeats are writes; a few per STALE_AFTER do
+        beat_interval = heartbeat_interval()
+        last_beat = 0
+        try:
+            while True:
+                if time.monotonic() - last_beat >= beat_interval:
+                    heartbeat(list(running.values()))
+                    requeue_stale()
+                    last_beat = time.monotonic()
+                for pk in claim_jobs(processes - len(running)):
+                    running[pool.submit(run_job_in_worker, pk)] = pk
+                if not running:
+                    if self.once:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+                done, _ = wait(
+                    running, timeout=self.poll_interval, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    pk = running[future]
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as exc:
+                        # Left running, so requeue_stale() retries it
+                        status = f"error ({exc})"
+                    del running[future]
+                    self.report(pk, status)
+        except BrokenProcessPool:
+            # Whatever was running is lost with the pool
+            for pk in running.values():
+                retry_or_fail(
+                    Job.objects.get(pk=pk), "The process running the job died."
+                )
+            raise
+
+    def report(self, pk, status):
+        style = self.style.SUCCESS if status == Job.SUCCEEDED else self.style.WARNING
+        self.stdout.write(style(f"Job {pk}: {status}"))
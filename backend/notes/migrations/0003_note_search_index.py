@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from notes.search import drop_search_index, ensure_search_index
+
+
+def create_search_index(apps, schema_editor):
+    ensure_search_index(schema_editor.connection, rebuild=True)
+
+
+def remove_search_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0002_alter_note_content"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:35
+
+import django.db.models.deletion
+import django.db.models.functions.text
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_tags(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    Tag = apps.get_model("notes", "Tag")
+    NoteTag = apps.get_model("notes", "NoteTag")
+
+    tag_ids = {}  # (user_id, lowercased name) -> Tag id
+    note_tags = []
+    notes = Note.objects.exclude(tags="").values_list("id", "user_id", "tags")
+    for note_id, user_id, tags in notes.iterator():
+        keys = set()
+        for name in (tag.strip() for tag in tags.split(",")):
+            key = (user_id, name.lower())
+            if not name or key in keys:
+                continue
+            keys.add(key)
+            if key not in tag_ids:
+                tag_ids[key] = Tag.objects.create(user_id=user_id, name=name).id
+            note_tags.append(NoteTag(note_id=note_id, tag_id=tag_ids[key]))
+    NoteTag.objects.bulk_create(note_tags, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0003_note_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tags",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="NoteTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "note",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="note_tags",
+                        to="notes.note",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="note_tags",
+                        to="notes.tag",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="note",
+            name="tag_objects",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="notes",
+                through="notes.NoteTag",
+                to="notes.tag",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tag",
+            constraint=models.UniqueConstraint(
+                models.F("user"),
+                django.db.models.functions.text.Lower("name"),
+                name="notes_tag_user_name_ci_uniq",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notetag",
+            index=models.Index(
+                fields=["tag", "note"], name="notes_notetag_tag_note_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notetag",
+            constraint=models.UniqueConstraint(
+                fields=("note", "tag"), name="notes_notetag_uniq"
+            ),
+        ),
+        migrations.RunPython(populate_tags, migrations.RunPython.noop),
+    ]
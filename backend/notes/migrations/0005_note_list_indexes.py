@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0004_tags"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="note",
+            name="category",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="notes",
+                to="notes.category",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="note",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="notes",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["user", "created_at"], name="category_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["user", "-is_pinned", "-updated_at"], name="note_user_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["user", "-is_pinned", "-updated_at"],
+                name="note_user_active_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("is_archived", True)),
+                fields=["user", "-is_pinned", "-updated_at"],
+                name="note_user_archived_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("category__isnull", False)),
+                fields=["category", "-is_pinned", "-updated_at"],
+                name="note_category_feed_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:39
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_active_notes(apps, schema_editor):
+    Category = apps.get_model("notes", "Category")
+    Note = apps.get_model("notes", "Note")
+    active_notes = (
+        Note.objects.filter(category=models.OuterRef("pk"), is_archived=False)
+        .order_by()
+        .values("category")
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    Category.objects.update(
+        active_notes_count=Coalesce(models.Subquery(active_notes), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0005_note_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="active_notes_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_active_notes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0006_category_active_notes_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="note",
+            name="note_user_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="note",
+            name="note_user_active_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="note",
+            name="note_user_archived_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="note",
+            name="note_category_feed_idx",
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("is_archived", False)),
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_active_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("is_archived", True)),
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_archived_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("category__isnull", False)),
+                fields=["category", "-is_pinned", "-updated_at", "-id"],
+                name="note_category_feed_idx",
+            ),
+        ),
+    ]
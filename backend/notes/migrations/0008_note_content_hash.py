@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:51
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_contents(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    batch = []
+    for note in Note.objects.only("pk", "content").iterator(chunk_size=500):
+        note.content_hash = hashlib.sha256(note.content.encode()).hexdigest()
+        batch.append(note)
+        if len(batch) == 500:
+            Note.objects.bulk_update(batch, ["content_hash"])
+            batch = []
+    Note.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0007_note_feed_indexes_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="note",
+            name="content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(hash_contents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0008_note_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="note",
+            name="version",
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
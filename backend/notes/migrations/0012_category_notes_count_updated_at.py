@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:31
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notes", "0011_jobs"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="notes_count_updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["user", "notes_count_updated_at"],
+                name="category_user_counted_idx",
+            ),
+        ),
+    ]
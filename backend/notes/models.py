@@ -1,24 +1,155 @@
+import hashlib
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower
 from django.utils import timezone
 
 
+class CategoryQuerySet(models.QuerySet):
+    def adjust_notes_count(self, delta):
+        """Atomically add ``delta`` to ``active_notes_count``."""
+        return self.update(
+            active_notes_count=F("active_notes_count") + delta,
+            notes_count_updated_at=timezone.now(),
+        )
+
+    def refresh_notes_count(self):
+        """
+        Recompute ``active_notes_count`` from the notes table in one UPDATE.
+        Returns the number of categories whose count changed.
+        """
+        active_notes = (
+            Note.objects.filter(category=OuterRef("pk"), is_archived=False)
+            .order_by()
+            .values("category")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        count = Coalesce(Subquery(active_notes), 0)
+        return self.exclude(active_notes_count=count).update(
+            active_notes_count=count, notes_count_updated_at=timezone.now()
+        )
+
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="categories")
     name = models.CharField(max_length=100)
     color = models.CharField(max_length=7, default="#3B82F6")  # Hex color code
+    # Denormalized count of unarchived notes, maintained by Note.save() and
+    # the post_delete handler in signals.py
+    active_notes_count = models.IntegerField(default=0, editable=False)
+    # When active_notes_count last changed, for incremental sync. Kept apart
+    # from updated_at, which note ETags include: a sibling note's write must
+    # not make every note of the category look changed.
+    notes_count_updated_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ["name"]
         unique_together = ["user", "name"]  # User can't have duplicate category names
+        indexes = [
+            # ?ordering=created_at; name ordering uses the unique index
+            models.Index(
+                fields=["user", "created_at"], name="category_user_created_idx"
+            ),
+            # Categories changed, or recounted, since a sync cursor
+            models.Index(
+                fields=["user", "updated_at"], name="category_user_updated_idx"
+            ),
+            models.Index(
+                fields=["user", "notes_count_updated_at"],
+                name="category_user_counted_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.name}"
+
+
+class TagQuerySet(models.QuerySet):
+    def for_names(self, user_id, names):
+        """Return ``{lowercased name: Tag}`` for the user's tags matching ``names``."""
+        keys = {name.lower() for name in names}
+        if not keys:
+            return {}
+        tags = self.annotate(key=Lower("name")).filter(user_id=user_id, key__in=keys)
+        return {tag.key: tag for tag in tags}
+
+    def ensure(self, user_id, names):
+        """``for_names()``, creating the user's tags that do not exist yet."""
+        tags = self.for_names(user_id, names)
+        missing = {}
+        for name in names:
+            if name.lower() not in tags:
+                missing.setdefault(name.lower(), name)
+        if missing:
+            # ignore_conflicts tolerates concurrent creation of the same tag
+            self.bulk_create(
+                [Tag(user_id=user_id, name=name) for name in missing.values()],
+                ignore_conflicts=True,
+            )
+            tags = self.for_names(user_id, names)
+        return tags
+
+
+class Tag(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tags")
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [
+            # Tags are matched case-insensitively, so "Work" and "work" are one tag
+            models.UniqueConstraint(
+                "user", Lower("name"), name="notes_tag_user_name_ci_uniq"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.name}"
 
 
+class NoteTag(models.Model):
+    note = models.ForeignKey("Note", on_delete=models.CASCADE, related_name="note_tags")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="note_tags")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["note", "tag"], name="notes_notetag_uniq"),
+        ]
+        indexes = [
+            # Tag filters look up notes by tag, the reverse of the unique index
+            models.Index(fields=["tag", "note"], name="notes_notetag_tag_note_idx"),
+        ]
+
+
+# ``tags`` is the source of truth and NoteTag rows mirror it. save() (and
+# imports, through link_tags()) update both; queryset updates would only
+# change the column, leaving tag filters matching the old tags.
+TAGS_WRITE_MESSAGE = "Write Note.tags through save(), which keeps NoteTag in sync."
+
+
+class NoteQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        if "tags" in kwargs:
+            raise ValueError(TAGS_WRITE_MESSAGE)
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if "tags" in fields:
+            raise ValueError(TAGS_WRITE_MESSAGE)
+        return super().bulk_update(objs, fields, batch_size)
+
+
 class Note(models.Model):
     PRIORITY_CHOICES = [
         ("low", "Low"),
@@ -26,11 +157,20 @@ class Note(models.Model):
         ("high", "High"),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notes")
+    # The composite indexes in Meta lead with these columns, which makes the
+    # default single-column FK indexes redundant.
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notes", db_index=False
+    )
     title = models.CharField(max_length=255)
     content = models.TextField(blank=True)
     category = models.ForeignKey(
-        Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="notes"
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="notes",
+        db_index=False,
     )
     priority = models.CharField(
         max_length=10, choices=PRIORITY_CHOICES, default="medium"
@@ -40,11 +180,58 @@ class Note(models.Model):
     tags = models.CharField(
         max_length=255, blank=True, help_text="Comma-separated tags"
     )
+    # SHA-256 of ``content``, maintained by ``save()``. Lets writes detect an
+    # unchanged body without loading it, and clients skip resending it.
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    # Bumped by every write (save() and bulk updates); clients send it back
+    # through ETag/If-Match to detect concurrent edits.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Normalized copy of ``tags`` used for indexed tag filtering; kept in sync
+    # by ``save()``, and NoteQuerySet refuses to update ``tags`` without it.
+    tag_objects = models.ManyToManyField(
+        Tag, through=NoteTag, related_name="notes", blank=True
+    )
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NoteQuerySet.as_manager()
+
     class Meta:
         ordering = ["-is_pinned", "-updated_at"]
+        # Each index serves a list query shape in its ordering, so pages are
+        # read straight off the index without a sort. The trailing id is the
+        # keyset pagination tiebreaker. `check_query_plans` verifies this.
+        indexes = [
+            # Unfiltered list, ?is_pinned=, ?priority= and the pinned action
+            models.Index(
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_feed_idx",
+            ),
+            # ?is_archived= (sent by the dashboard on every load) and the
+            # archived action. Boolean filters compile to `NOT is_archived` /
+            # `is_archived`, which only partial indexes can match.
+            models.Index(
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_active_feed_idx",
+                condition=models.Q(is_archived=False),
+            ),
+            models.Index(
+                fields=["user", "-is_pinned", "-updated_at", "-id"],
+                name="note_user_archived_feed_idx",
+                condition=models.Q(is_archived=True),
+            ),
+            # ?category=, also used by SET_NULL when a category is deleted.
+            # Uncategorized notes are never looked up by category.
+            models.Index(
+                fields=["category", "-is_pinned", "-updated_at", "-id"],
+                name="note_category_feed_idx",
+                condition=models.Q(category__isnull=False),
+            ),
+            # Notes changed since a sync cursor, in sync order (see sync.py)
+            models.Index(
+                fields=["user", "updated_at", "id"], name="note_user_sync_idx"
+            ),
+        ]
 
     def clean(self):
         """Validate that category belongs to the same user as the note"""
@@ -56,6 +243,100 @@ class Note(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.title}"
 
+    # Fields whose last saved values are remembered so save() can tell what
+    # changed; see _loaded_values.
+    TRACKED_FIELDS = ("tags", "category_id", "is_archived")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None:
+            self._remember_loaded_values()
+        else:
+            # Loading a deferred field (such as version in save()) must not
+            # take unsaved values of the others for saved ones
+            loaded = {self._meta.get_field(name).attname for name in fields}
+            self._remember_loaded_values(
+                [field for field in self.TRACKED_FIELDS if field in loaded]
+            )
+
+    def _remember_loaded_values(self, fields=TRACKED_FIELDS):
+        if not hasattr(self, "_loaded_values"):
+            self._loaded_values = {}
+        for field in fields:
+            if field in self.__dict__:
+                self._loaded_values[field] = self.__dict__[field]
+
+    @staticmethod
+    def hash_content(content):
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    @staticmethod
+    def active_category_id(values):
+        """The category whose active_notes_count includes a note with ``values``."""
+        if values.get("is_archived", False):
+            return None
+        return values.get("category_id")
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = {
+                self._meta.get_field(name).attname for name in update_fields
+            }
+        if "content" in self.__dict__ and (
+            update_fields is None or "content" in update_fields
+        ):
+            self.content_hash = self.hash_content(self.content)
+            if update_fields is not None:
+                update_fields.add("content_hash")
+        if not self._state.adding:
+            self.version += 1
+            if update_fields is not None:
+                update_fields.add("version")
+        if update_fields is not None:
+            kwargs["update_fields"] = update_fields
+        # New notes have no previous values, which reads as "no tags, in no
+        # category"
+        previous = getattr(self, "_loaded_values", {})
+        saved_fields = [
+            field
+            for field in self.TRACKED_FIELDS
+            if field in self.__dict__
+            and (update_fields is None or field in update_fields)
+        ]
+        current = {
+            **previous,
+            **{field: self.__dict__[field] for field in saved_fields},
+        }
+
+        tags_changed = current.get("tags", "") != previous.get("tags", "")
+        old_category_id = self.active_category_id(previous)
+        new_category_id = self.active_category_id(current)
+
+        if not tags_changed and old_category_id == new_category_id:
+            super().save(*args, **kwargs)
+        else:
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+                if tags_changed:
+                    self.sync_tag_objects()
+                if old_category_id != new_category_id:
+                    if old_category_id is not None:
+                        Category.objects.filter(pk=old_category_id).adjust_notes_count(
+                            -1
+                        )
+                    if new_category_id is not None:
+                        Category.objects.filter(pk=new_category_id).adjust_notes_count(
+                            1
+                        )
+        self._remember_loaded_values(saved_fields)
+
     @property
     def tag_list(self):
         """Return tags as a list"""
@@ -64,3 +345,138 @@ class Note(models.Model):
     def set_tags(self, tag_list):
         """Set tags from a list"""
         self.tags = ", ".join(tag_list)
+
+    def sync_tag_objects(self):
+        """Point ``tag_objects`` at the tags in ``tags``, creating missing ones."""
+        names = {}
+        for name in self.tag_list:
+            names.setdefault(name.lower(), name)
+
+        tags = Tag.objects.ensure(self.user_id, names.values())
+        tag_ids = {tag.id for tag in tags.values()}
+        NoteTag.objects.filter(note=self).exclude(tag_id__in=tag_ids).delete()
+        NoteTag.objects.bulk_create(
+            [NoteTag(note=self, tag_id=tag_id) for tag_id in tag_ids],
+            ignore_conflicts=True,
+        )
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted note or category, so incremental sync can report the
+    deletion. Written by the post_delete handler in signals.py and by bulk
+    deletes; pruned by the ``prune_tombstones`` command.
+    """
+
+    NOTE = "note"
+    CATEGORY = "category"
+    KIND_CHOICES = [
+        (NOTE, "Note"),
+        (CATEGORY, "Category"),
+    ]
+
+    # The index in Meta leads with user
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="tombstones", db_index=False
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"
+            ),
+            # prune_tombstones deletes by age across all users
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
+
+
+class Job(models.Model):
+    """
+    A long-running operation queued for the ``run_jobs`` worker (see
+    jobs.py). Handlers registered for ``kind`` read ``params`` and
+    ``input_file``, and leave ``result`` and, for downloads, ``output_file``.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    # Empty for maintenance jobs queued from the command line
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="jobs", null=True, blank=True
+    )
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    input_file = models.FileField(upload_to="jobs/input/", blank=True)
+    output_file = models.FileField(upload_to="jobs/output/", blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Queued jobs wait until then; retries are pushed back by the backoff
+    run_after = models.DateTimeField(default=timezone.now)
+    # Refreshed by the worker while the job runs, so crashed runs are noticed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            # The worker's queue scan
+            models.Index(
+                fields=["status", "run_after"], name="job_status_run_after_idx"
+            ),
+            models.Index(fields=["user", "-created_at"], name="job_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
+
+    def report_progress(self, **progress):
+        """Store ``progress`` for the status endpoint, without touching the rest."""
+        self.progress = progress
+        Job.objects.filter(pk=self.pk).update(progress=progress)
+
+
+class StreamTicket(models.Model):
+    """
+    A single-use credential for opening the change event stream, which
+    browsers' EventSource cannot send an Authorization header to (see
+    events.py). Only a digest of the ticket is stored. Used tickets are
+    deleted; expired ones are swept when new ones are issued.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="stream_tickets"
+    )
+    # Redeemable until then
+    expires_at = models.DateTimeField()
+    # When the access token the ticket was issued for expires; the stream it
+    # opens closes then
+    stream_expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="streamticket_expires_idx"),
+        ]
+
+    def __str__(self):
+        return f"Stream ticket for {self.user.email} until {self.expires_at}"
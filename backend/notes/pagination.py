@@ -0,0 +1,163 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    PageNumberPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class NotePageNumberPagination(PageNumberPagination):
+    """Page-number pagination with a client-chosen, server-capped page size."""
+
+    page_size_query_param = "page_size"
+    max_page_size = settings.NOTES_MAX_PAGE_SIZE
+
+
+class NoteKeysetPagination(BasePagination):
+    """
+    Keyset pagination over the notes feed order (-is_pinned, -updated_at, -id).
+
+    Each page seeks past the last note of the previous one with a row-value
+    comparison that the feed indexes can serve, so deep pages cost the same
+    as the first and no COUNT query is run. Notes that are edited (and so move
+    to the top of the feed) while a client pages never show up twice.
+
+    Selected per request with ``?pagination=cursor`` or by passing a
+    ``cursor``; page-number pagination stays the default.
+    """
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+    mode = "cursor"
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    page_size_query_param = "page_size"
+    max_page_size = settings.NOTES_MAX_PAGE_SIZE
+    ordering = ("-is_pinned", "-updated_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    @classmethod
+    def is_requested(cls, request):
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode or (
+            cls.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if "ordering" in request.query_params:
+            raise ValidationError(
+                {"ordering": "Cursor pagination always uses the feed order."}
+            )
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(queryset, position))
+
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def after(self, queryset, position):
+        """Condition selecting the notes that come after ``position``."""
+        is_pinned, updated_at, pk = position
+        connection = connections[queryset.db]
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ", ".join(
+            f"{table}.{connection.ops.quote_name(column)}"
+            for column in ("is_pinned", "updated_at", "id")
+        )
+        return RawSQL(
+            f"({columns}) < (%s, %s, %s)",
+            [is_pinned, connection.ops.adapt_datetimefield_value(updated_at), pk],
+            output_field=BooleanField(),
+        )
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            return (
+                bool(data["p"]),
+                datetime.fromisoformat(data["u"]),
+                int(data["i"]),
+            )
+        except (binascii.Error, KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message) from None
+
+    def encode_cursor(self, note):
+        data = {"p": note.is_pinned, "u": note.updated_at.isoformat(), "i": note.pk}
+        encoded = base64.urlsafe_b64encode(json.dumps(data).encode("ascii"))
+        return encoded.decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to 'cursor' for keyset pagination.",
+                "schema": {"type": "string", "enum": [self.mode]},
+            },
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from the previous page's next link.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Notes per page (at most {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,59 @@
+"""
+Password hashing for signup and login.
+
+Each signup and login runs PBKDF2-SHA256 over the password, a million
+iterations by default: over half a second of CPU on a typical core, far more
+than anything else the API does. ``PBKDF2PasswordHasher`` takes its
+iteration count from NOTES_PASSWORD_ITERATIONS instead of Django's release
+default. The hashes it writes are ordinary ``pbkdf2_sha256`` ones; when the
+setting changes, a stored password is rehashed with the new count the next
+time its user logs in.
+
+Under ASGI, Django gives every request its own thread for its sync view, so
+a burst of signups hashes on as many threads at once as there are requests,
+and starves every other request of CPU. ``hashing_view`` runs a view on a
+fixed pool of NOTES_PASSWORD_THREADS threads instead, which bounds the
+hashes in progress; ``hashlib`` releases the GIL while it hashes, so they
+run on separate cores. This is only active when NOTES_PASSWORD_POOL is set,
+which ``asgi.py`` does.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, wraps
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from .async_reads import run_read
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """Django's PBKDF2 hasher with NOTES_PASSWORD_ITERATIONS iterations."""
+
+    @property
+    def iterations(self):
+        return settings.NOTES_PASSWORD_ITERATIONS
+
+
+@cache
+def get_hash_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.NOTES_PASSWORD_THREADS,
+        thread_name_prefix="notes-password",
+    )
+
+
+def hashing_view(view):
+    """Serve ``view``, which hashes passwords, from the hashing pool under ASGI."""
+    if not settings.NOTES_PASSWORD_POOL:
+        return view
+
+    # run_read() renders the response and keeps up the thread's connection
+    run = SyncToAsync(run_read, thread_sensitive=False, executor=get_hash_executor())
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run(view, request, *args, **kwargs)
+
+    return async_view
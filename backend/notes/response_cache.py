@@ -0,0 +1,127 @@
+"""
+Per-user cache of note and category read responses.
+
+``CachedReadsMixin.cached_response()`` stores the serialized data (and ETag)
+of a successful read under a key built from the user, the URL name and
+arguments, and the normalized query parameters. Repeating the request skips
+the queries and the serializer, and ``If-None-Match`` is answered from the
+cached ETag.
+
+Keys also carry the user's generation, a counter bumped after every commit
+that writes one of their notes or categories (see ``signals.py`` and
+``bulk.py``). A write therefore retires all of the user's cached responses
+at once without finding them; they age out of the cache on their own. A
+generation is read before the response is built, so a read racing a write
+is cached under the old generation and never served.
+
+Entries and generations live in the NOTES_RESPONSE_CACHE cache alias. It
+must be shared by every server process (Redis, memcached): a generation
+bumped in one process's memory would leave the others serving what the
+write changed. Without one (NOTES_RESPONSE_CACHE = None, the default when
+REDIS_URL is unset) nothing is cached. Hits and misses are counted per view
+action in the request metrics.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .conditional import check_read_preconditions, set_etag
+from .instrumentation import registry, resolve_labels
+
+GENERATION_KEY = "notes:responses:generation:{user_id}"
+RESPONSE_KEY = "notes:responses:{user_id}:{generation}:{digest}"
+
+
+def get_cache():
+    return caches[settings.NOTES_RESPONSE_CACHE]
+
+
+def read_generation(cache, key):
+    """The generation counter stored in ``cache`` at ``key``."""
+    value = cache.get(key)
+    if value is None:
+        # Start from the clock, not 0, so a generation evicted from the cache
+        # cannot come back with a number its old entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(cache, key):
+    """Move the generation counter at ``key`` on, retiring its entries."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def generation(user_id):
+    """The current generation of ``user_id``'s cached responses."""
+    return read_generation(get_cache(), GENERATION_KEY.format(user_id=user_id))
+
+
+def invalidate_responses(user_id):
+    """Retire ``user_id``'s cached responses once the current transaction commits."""
+    if settings.NOTES_RESPONSE_CACHE is None:
+        return
+    key = GENERATION_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: bump_generation(get_cache(), key))
+
+
+def response_key(request):
+    """The cache key of ``request``'s response for its user's current generation."""
+    match = request.resolver_match
+    parts = [
+        request.scheme,
+        request.get_host(),
+        match.view_name,
+        repr(sorted(match.kwargs.items())),
+        *sorted(
+            f"{name}={value}"
+            for name, values in request.query_params.lists()
+            for value in values
+        ),
+    ]
+    digest = hashlib.md5("\n".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        generation=generation(request.user.pk),
+        digest=digest,
+    )
+
+
+class CachedReadsMixin:
+    """Serve repeated reads of a viewset from the response cache."""
+
+    def cached_response(self, build):
+        """
+        Return the cached response to this GET request, or the one ``build()``
+        returns, caching it when it is a complete 200 response.
+        """
+        if settings.NOTES_RESPONSE_CACHE is None:
+            return build()
+        request = self.request
+        key = response_key(request)
+        entry = get_cache().get(key)
+        view, action = resolve_labels(request)
+        registry.record_cache(view, action, hit=entry is not None)
+
+        if entry is None:
+            response = build()
+            if response.status_code == 200 and not response.streaming:
+                entry = {"data": response.data, "etag": response.get("ETag")}
+                get_cache().set(key, entry, settings.NOTES_RESPONSE_CACHE_TIMEOUT)
+            return response
+
+        etag = entry["etag"]
+        if etag is None:
+            return Response(entry["data"])
+        not_modified = check_read_preconditions(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return set_etag(Response(entry["data"]), etag)
@@ -0,0 +1,265 @@
+"""
+Full-text search backends for notes.
+
+SQLite deployments use an FTS5 external-content table (``notes_note_fts``)
+kept in sync with ``notes_note`` by triggers, so every write path (ORM saves,
+queryset updates, raw SQL) updates the index. PostgreSQL deployments use a
+GIN index over a weighted ``tsvector`` expression, which the database keeps
+current on its own. Any other backend falls back to ``icontains`` filtering.
+
+Every backend annotates matching notes with ``search_rank`` (higher is more
+relevant) and ``search_snippet``, a short excerpt with the matched terms
+between the HIGHLIGHT_START and HIGHLIGHT_END control characters.
+``mark_up()`` turns it into the HTML the API returns: the note's text
+escaped, and only the matches wrapped in ``<mark>`` tags.
+"""
+
+import logging
+import re
+
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.utils import OperationalError
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_MIGRATION = "0003_note_search_index"
+FTS_TABLE = "notes_note_fts"
+# Control characters rather than tags, so that what the database marks can
+# be told apart from markup in the note itself
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SNIPPET_WORDS = 12
+
+# Column weights used for ranking: a hit in the title counts more than a hit
+# in the tags, which counts more than a hit in the body.
+TITLE_WEIGHT = 10.0
+TAGS_WEIGHT = 5.0
+CONTENT_WEIGHT = 1.0
+
+SQLITE_TRIGGERS = {
+    f"{FTS_TABLE}_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON notes_note
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+            VALUES (new.id, new.title, new.content, new.tags);
+        END
+    """,
+    f"{FTS_TABLE}_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON notes_note
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+        END
+    """,
+    f"{FTS_TABLE}_au": f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF title, content, tags ON notes_note
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+            INSERT INTO {FTS_TABLE}(rowid, title, content, tags)
+            VALUES (new.id, new.title, new.content, new.tags);
+        END
+    """,
+}
+
+POSTGRES_INDEX = "notes_note_search_gin"
+POSTGRES_CONFIG = "simple"
+# Shared by the index definition and the queries so the planner can match
+# the indexed expression.
+POSTGRES_DOCUMENT = (
+    f"(setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(title, '')), 'A')"
+    f" || setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(tags, '')), 'B')"
+    f" || setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(content, '')), 'C'))"
+)
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+# Connection alias -> whether the FTS5 table and its triggers are installed.
+_fts5_installed = {}
+
+
+def parse_query(text):
+    """Split raw user input into lower-cased search terms."""
+    return [term.lower() for term in _TERM_RE.findall(text or "")]
+
+
+class ContainsSearchBackend:
+    """Fallback backend using case-insensitive substring matching."""
+
+    def search(self, queryset, text):
+        terms = parse_query(text)
+        if not terms:
+            return queryset
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(content__icontains=term)
+                | Q(tags__icontains=term)
+            )
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Value(""),
+        )
+
+
+def mark_up(snippet):
+    """``snippet`` as HTML: escaped, with its highlighted matches in ``<mark>``."""
+    return (
+        escape(snippet)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
+
+
+class SQLiteFTS5SearchBackend:
+    """Ranked search against the ``notes_note_fts`` FTS5 table."""
+
+    def build_match(self, terms):
+        # Every term is quoted so user input can never be parsed as FTS5
+        # syntax; the last term is a prefix match for search-as-you-type.
+        quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+    def search(self, queryset, text):
+        terms = parse_query(text)
+        if not terms:
+            return queryset
+        # bm25() and snippet() are only valid with the FTS table in the FROM
+        # clause of the MATCH query, which annotate() cannot express.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = notes_note.id", f"{FTS_TABLE} MATCH %s"],
+            params=[self.build_match(terms)],
+            select={
+                "search_rank": (
+                    f"-bm25({FTS_TABLE}, {TITLE_WEIGHT}, {CONTENT_WEIGHT}, "
+                    f"{TAGS_WEIGHT})"
+                ),
+                "search_snippet": (
+                    f"snippet({FTS_TABLE}, -1, '{HIGHLIGHT_START}', "
+                    f"'{HIGHLIGHT_END}', '…', {SNIPPET_WORDS})"
+                ),
+            },
+        )
+
+
+class PostgresSearchBackend:
+    """Ranked search against the weighted ``tsvector`` GIN index."""
+
+    def build_tsquery(self, terms):
+        return " & ".join(terms) + ":*"
+
+    def search(self, queryset, text):
+        terms = parse_query(text)
+        if not terms:
+            return queryset
+        tsquery = self.build_tsquery(terms)
+        query_sql = f"to_tsquery('{POSTGRES_CONFIG}', %s)"
+        headline_options = (
+            f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords=3"
+        )
+        return queryset.extra(
+            where=[f"{POSTGRES_DOCUMENT} @@ {query_sql}"], params=[tsquery]
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank_cd({POSTGRES_DOCUMENT}, {query_sql})",
+                [tsquery],
+                output_field=FloatField(),
+            ),
+            search_snippet=RawSQL(
+                f"ts_headline('{POSTGRES_CONFIG}', "
+                "coalesce(nullif(content, ''), title), "
+                f"{query_sql}, %s)",
+                [tsquery, headline_options],
+            ),
+        )
+
+
+def _sqlite_index_installed(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR name IN (%s, %s, %s)",
+            [FTS_TABLE, *SQLITE_TRIGGERS],
+        )
+        return {row[0] for row in cursor.fetchall()} == {FTS_TABLE, *SQLITE_TRIGGERS}
+
+
+def fts5_installed(connection):
+    if connection.alias not in _fts5_installed:
+        _fts5_installed[connection.alias] = _sqlite_index_installed(connection)
+    return _fts5_installed[connection.alias]
+
+
+def ensure_search_index(connection, rebuild=False):
+    """
+    Create the search index for ``connection`` if it is missing.
+
+    SQLite drops a table's triggers whenever Django rebuilds the table during
+    a migration, so this also runs after every ``migrate`` and repopulates the
+    index whenever the triggers had to be recreated.
+    """
+    if connection.vendor == "sqlite":
+        if not rebuild and _sqlite_index_installed(connection):
+            return
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "title, content, tags, content='notes_note', content_rowid='id', "
+                    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+                for sql in SQLITE_TRIGGERS.values():
+                    cursor.execute(sql)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+                )
+            _fts5_installed[connection.alias] = True
+        except OperationalError:
+            _fts5_installed[connection.alias] = False
+            logger.warning(
+                "SQLite FTS5 is unavailable; note search falls back to icontains."
+            )
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            if rebuild:
+                cursor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {POSTGRES_INDEX} ON notes_note "
+                f"USING GIN ({POSTGRES_DOCUMENT})"
+            )
+
+
+def drop_search_index(connection):
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        _fts5_installed[connection.alias] = False
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
+
+
+def get_search_backend(using="default"):
+    """Return the search backend matching the database behind ``using``."""
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite" and fts5_installed(connection):
+        return SQLiteFTS5SearchBackend()
+    return ContainsSearchBackend()
+
+
+def ensure_search_index_post_migrate(sender, using="default", **kwargs):
+    connection = connections[using]
+    applied = MigrationRecorder(connection).applied_migrations()
+    if (sender.label, SEARCH_INDEX_MIGRATION) in applied:
+        ensure_search_index(connection)
@@ -1,18 +1,28 @@
-from rest_framework import serializers
+import datetime
+from functools import cached_property, partial
+from operator import attrgetter
 
-from .models import Category, Note
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import SkipField, empty
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+from .bulk import OPERATIONS
+from .models import Category, Job, Note
+from .search import mark_up
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    notes_count = serializers.SerializerMethodField()
+    notes_count = serializers.IntegerField(source="active_notes_count", read_only=True)
 
     class Meta:
         model = Category
         fields = ["id", "name", "color", "notes_count", "created_at", "updated_at"]
 
-    def get_notes_count(self, obj):
-        return obj.notes.filter(is_archived=False).count()
-
 
 class NoteSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
@@ -35,6 +45,8 @@ class NoteSerializer(serializers.ModelSerializer):
             "is_archived",
             "tags",
             "tag_list",
+            "content_hash",
+            "version",
             "created_at",
             "updated_at",
         ]
@@ -52,21 +64,37 @@ class NoteSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         tag_list = validated_data.pop("tag_list", [])
-        note = Note.objects.create(**validated_data)
+        note = Note(**validated_data)
         if tag_list:
             note.set_tags(tag_list)
-            note.save()
+        note.save()
         return note
 
     def update(self, instance, validated_data):
+        """Write only the columns whose values change; skip no-op saves."""
         tag_list = validated_data.pop("tag_list", None)
+        if tag_list is not None:
+            validated_data["tags"] = ", ".join(tag_list)
+
+        changed = []
         for attr, value in validated_data.items():
+            field = Note._meta.get_field(attr)
+            if field.attname == "content" and "content" not in instance.__dict__:
+                # The view defers content on writes: compare hashes instead of
+                # loading the stored body.
+                unchanged = Note.hash_content(value) == instance.content_hash
+            elif field.is_relation:
+                unchanged = getattr(instance, field.attname) == (
+                    value.pk if value is not None else None
+                )
+            else:
+                unchanged = getattr(instance, attr) == value
             setattr(instance, attr, value)
+            if not unchanged:
+                changed.append(attr)
 
-        if tag_list is not None:
-            instance.set_tags(tag_list)
-
-        instance.save()
+        if changed:
+            instance.save(update_fields=[*changed, "updated_at"])
         return instance
 
     def to_representation(self, instance):
@@ -75,9 +103,169 @@ class NoteSerializer(serializers.ModelSerializer):
         return data
 
 
-class NoteListSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """Serialize only the fields named in the ``fields`` keyword argument."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def represent_field(field, instance):
+    """``field``'s value for ``instance``, as Serializer.to_representation() has it."""
+    attribute = field.get_attribute(instance)
+    check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+    return None if check_for_none is None else field.to_representation(attribute)
+
+
+def is_plain_source(model, source_attrs):
+    """
+    Whether ``source_attrs`` reads plain values from ``model`` instances:
+    fields, followed through forward relations, then at most one property or
+    annotation. DRF calls methods found along a source, so those are not plain.
+    """
+    for index, attr in enumerate(source_attrs):
+        if model is None:
+            return False
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            last = index == len(source_attrs) - 1
+            return last and not callable(getattr(model, attr, None))
+        if not model_field.concrete:
+            return False
+        model = model_field.related_model
+    return True
+
+
+def datetime_converter(field):
+    """
+    ``field.to_representation`` for ISO 8601 output, looking up the time zone
+    once rather than for every value.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = (
+        field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    )
+    if (
+        output_format is None
+        or output_format.lower() != ISO_8601
+        or field_timezone is None
+    ):
+        return field.to_representation
+
+    def convert(value):
+        if not isinstance(value, datetime.datetime) or timezone.is_naive(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+# Field classes whose to_representation() is exactly the builtin
+FIELD_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+}
+
+
+def field_converter(field):
+    if type(field) is serializers.DateTimeField:
+        return datetime_converter(field)
+    return FIELD_CONVERTERS.get(type(field), field.to_representation)
+
+
+class CompiledRepresentationMixin:
+    """
+    A ModelSerializer whose ``to_representation()`` skips DRF's per-field
+    machinery.
+
+    Serializer.to_representation() resolves each field of each object through
+    Field.get_attribute(), which walks the source path and checks every step
+    for a callable to call. The first object serialized here compiles the
+    readable fields into a plan: an ``attrgetter`` for plain sources, the
+    foreign key column for primary key relations, and a builtin in place of
+    to_representation() where they agree. The plan is reused for every object
+    of a ``many=True`` serializer, and the output is the same as DRF's. A
+    value the getter cannot reach (a null relation, a missing annotation)
+    leaves the field out or null by the rules of Field.get_attribute(). Date-times
+    are rendered in the time zone that is current when the plan is compiled.
+    """
+
+    @cached_property
+    def _representation_plan(self):
+        model = self.Meta.model
+        plan = []
+        for field in self._readable_fields:
+            getter = convert = None
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is None and len(field.source_attrs) == 1:
+                    try:
+                        model_field = model._meta.get_field(field.source)
+                    except FieldDoesNotExist:
+                        model_field = None
+                    if model_field is not None and model_field.many_to_one:
+                        getter = attrgetter(model_field.attname)
+            elif field.source != "*" and is_plain_source(model, field.source_attrs):
+                getter = attrgetter(field.source)
+                convert = field_converter(field)
+            if getter is None:
+                getter = partial(represent_field, field)
+            # Field.get_attribute() skips a read-only field it cannot reach
+            skip_missing = (
+                field.default is empty and not field.allow_null and not field.required
+            )
+            plan.append((field.field_name, field, getter, convert, skip_missing))
+        return plan
+
+    def to_representation(self, instance):
+        ret = {}
+        for name, field, getter, convert, skip_missing in self._representation_plan:
+            try:
+                value = getter(instance)
+            except SkipField:
+                continue
+            except ObjectDoesNotExist:
+                ret[name] = None
+                continue
+            except AttributeError:
+                if skip_missing:
+                    continue
+                try:
+                    ret[name] = represent_field(field, instance)
+                except SkipField:
+                    pass
+                continue
+            ret[name] = value if value is None or convert is None else convert(value)
+        return ret
+
+
+class SearchSnippetField(serializers.CharField):
+    """A search backend's snippet, as escaped HTML with ``<mark>``ed matches."""
+
+    def to_representation(self, value):
+        return mark_up(value)
+
+
+class NoteListSerializer(
+    CompiledRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer
+):
     category_name = serializers.CharField(source="category.name", read_only=True)
     category_color = serializers.CharField(source="category.color", read_only=True)
+    content_preview = serializers.CharField(read_only=True)
+    tag_list = serializers.ListField(child=serializers.CharField(), read_only=True)
+    # Only present on search results
+    search_rank = serializers.FloatField(read_only=True)
+    search_snippet = SearchSnippetField(read_only=True)
+
+    # Left out of list responses unless requested with ?fields=
+    opt_in_fields = {"content"}
 
     class Meta:
         model = Note
@@ -85,6 +273,7 @@ class NoteListSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "content",
+            "content_preview",
             "category",
             "category_name",
             "category_color",
@@ -92,11 +281,132 @@ class NoteListSerializer(serializers.ModelSerializer):
             "is_pinned",
             "is_archived",
             "tags",
+            "version",
             "created_at",
             "updated_at",
+            "search_rank",
+            "search_snippet",
+            "tag_list",
         ]
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data["tag_list"] = instance.tag_list
-        return data
+
+class NoteImportSerializer(serializers.Serializer):
+    """One note read from an import file (see imports.py)."""
+
+    title = serializers.CharField(max_length=255)
+    content = serializers.CharField(
+        required=False, default="", allow_blank=True, trim_whitespace=False
+    )
+    category_name = serializers.CharField(
+        max_length=100, required=False, allow_null=True, allow_blank=True
+    )
+    # Used when the category has to be created
+    category_color = serializers.RegexField(
+        r"^#[0-9A-Fa-f]{6}$", required=False, allow_null=True, allow_blank=True
+    )
+    tag_list = serializers.ListField(
+        child=serializers.CharField(max_length=50), required=False, default=list
+    )
+    priority = serializers.ChoiceField(choices=Note.PRIORITY_CHOICES, default="medium")
+    is_pinned = serializers.BooleanField(default=False)
+    is_archived = serializers.BooleanField(default=False)
+
+    def validate_tag_list(self, value):
+        if len(", ".join(value)) > Note._meta.get_field("tags").max_length:
+            raise serializers.ValidationError("Too many tags.")
+        return value
+
+
+class NoteBulkSerializer(serializers.Serializer):
+    """Request body of the bulk action: which notes, and what to do to them."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.NOTES_BULK_MAX_IDS,
+    )
+    operation = serializers.ChoiceField(choices=OPERATIONS)
+    category = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.all(), allow_null=True, required=False
+    )
+    # Run as a background job and answer 202 with it; unset, above
+    # NOTES_BULK_BACKGROUND_IDS ids
+    background = serializers.BooleanField(allow_null=True, default=None)
+
+    def validate_category(self, value):
+        """Ensure the category belongs to the current user"""
+        if value is not None and value.user_id != self.context["request"].user.id:
+            raise serializers.ValidationError(
+                "Category does not exist or does not belong to user."
+            )
+        return value
+
+    def validate(self, attrs):
+        if attrs["operation"] == "set_category" and "category" not in attrs:
+            raise serializers.ValidationError(
+                {"category": "This field is required for set_category."}
+            )
+        return attrs
+
+
+class ContentOpSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=["insert", "delete"])
+    pos = serializers.IntegerField(min_value=0)
+    text = serializers.CharField(
+        required=False, allow_blank=False, trim_whitespace=False
+    )
+    count = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        required = "text" if attrs["op"] == "insert" else "count"
+        if required not in attrs:
+            raise serializers.ValidationError(
+                {required: f"This field is required for {attrs['op']}."}
+            )
+        return attrs
+
+
+class NoteContentPatchSerializer(serializers.Serializer):
+    """
+    Edits to a note's content, made against the version whose content_hash is
+    ``base_hash``. Positions are in UTF-16 code units (see textpatch.py).
+    """
+
+    base_hash = serializers.CharField(max_length=64)
+    ops = serializers.ListField(
+        child=ContentOpSerializer(),
+        allow_empty=False,
+        max_length=settings.NOTES_CONTENT_PATCH_MAX_OPS,
+    )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """A background job's status, progress and outcome."""
+
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "kind",
+            "status",
+            "progress",
+            "result",
+            "error",
+            "attempts",
+            "max_attempts",
+            "run_after",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "download_url",
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, job) -> str | None:
+        if job.status != Job.SUCCEEDED or not job.output_file:
+            return None
+        url = reverse("job-download", args=[job.pk])
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import revoke_user
+from .events import publish
+from .models import Category, Note, Tombstone
+from .response_cache import invalidate_responses
+from .stats import invalidate_stats
+
+# Set while a bulk operation writes many notes at once; it recounts the
+# affected categories and invalidates the cached stats once for the batch.
+_in_bulk_operation = ContextVar("notes_in_bulk_operation", default=False)
+
+
+@contextmanager
+def bulk_operation():
+    """Skip the per-note counter and cache upkeep below for the enclosed writes."""
+    token = _in_bulk_operation.set(True)
+    try:
+        yield
+    finally:
+        _in_bulk_operation.reset(token)
+
+
+@receiver(post_delete, sender=Note)
+def release_category_count(sender, instance, **kwargs):
+    """Drop a deleted note from its category's active_notes_count.
+
+    Runs for instance and queryset deletes alike, inside the deletion's
+    transaction.
+    """
+    if _in_bulk_operation.get():
+        return
+    values = {**instance.__dict__, **getattr(instance, "_loaded_values", {})}
+    category_id = Note.active_category_id(values)
+    if category_id is not None:
+        Category.objects.filter(pk=category_id).adjust_notes_count(-1)
+
+
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Category)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Leave a Tombstone for incremental sync when a note or category is deleted.
+
+    Bulk deletes write their tombstones in one statement, and nothing is
+    recorded when the whole account is being deleted.
+    """
+    if _in_bulk_operation.get():
+        return
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if issubclass(origin_model, User):
+        return
+    kind = Tombstone.NOTE if sender is Note else Tombstone.CATEGORY
+    Tombstone.objects.create(user_id=instance.user_id, kind=kind, object_id=instance.pk)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_user_caches(sender, instance, **kwargs):
+    """Drop the owner's cached stats and responses after any note or category write.
+
+    Deleting a category also moves its notes out of it (SET_NULL) without
+    saving them; the category's post_delete covers those notes as well.
+    """
+    if _in_bulk_operation.get():
+        return
+    invalidate_stats(instance.user_id)
+    invalidate_responses(instance.user_id)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def publish_change(sender, instance, signal, created=False, **kwargs):
+    """Notify the owner's event stream connections of a note or category write."""
+    if _in_bulk_operation.get():
+        return
+    if signal is post_delete:
+        change = "deleted"
+    else:
+        change = "created" if created else "updated"
+    event = {
+        "type": f"{'note' if sender is Note else 'category'}.{change}",
+        "id": instance.pk,
+    }
+    if sender is Note and change != "deleted":
+        event["version"] = instance.version
+    publish(instance.user_id, event)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_cached_tokens(sender, instance, **kwargs):
+    """Verify the user's tokens afresh after a change such as deactivation."""
+    revoke_user(instance.pk)
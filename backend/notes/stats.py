@@ -0,0 +1,94 @@
+"""
+Per-user note statistics for the dashboard.
+
+The note counts come from one conditional-aggregate query and the
+per-category breakdown from the categories' denormalized
+``active_notes_count``, so building the stats costs two queries however
+many notes a user has. Results are cached per user in the NOTES_STATS_CACHE
+cache alias. As in the response cache, their key carries a generation that
+every commit writing one of the user's notes or categories moves on (see
+``signals.py``), and which is read before the stats are computed: stats that
+raced a write are stored under the old generation and never served. Like
+the response cache, this needs a cache shared by every server process, and
+is off (None) without one.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Category, Note
+from .response_cache import bump_generation, read_generation
+
+GENERATION_KEY = "notes:stats:generation:{user_id}"
+CACHE_KEY = "notes:stats:{user_id}:{generation}"
+
+
+def cache_key(cache, user_id):
+    """The key of ``user_id``'s stats for their current generation."""
+    generation = read_generation(cache, GENERATION_KEY.format(user_id=user_id))
+    return CACHE_KEY.format(user_id=user_id, generation=generation)
+
+
+def compute_stats(user):
+    active = Q(is_archived=False)
+    counts = Note.objects.filter(user=user).aggregate(
+        total_notes=Count("pk"),
+        active_notes=Count("pk", filter=active),
+        pinned_notes=Count("pk", filter=Q(is_pinned=True)),
+        archived_notes=Count("pk", filter=Q(is_archived=True)),
+        uncategorized_notes=Count("pk", filter=active & Q(category__isnull=True)),
+        **{
+            f"priority_{value}": Count("pk", filter=active & Q(priority=value))
+            for value, _label in Note.PRIORITY_CHOICES
+        },
+    )
+    categories = list(
+        Category.objects.filter(user=user)
+        .order_by("name")
+        .values("id", "name", "color", "active_notes_count")
+    )
+    return {
+        "total_notes": counts["total_notes"],
+        "active_notes": counts["active_notes"],
+        "pinned_notes": counts["pinned_notes"],
+        "archived_notes": counts["archived_notes"],
+        "categories_count": len(categories),
+        "by_priority": {
+            value: counts[f"priority_{value}"]
+            for value, _label in Note.PRIORITY_CHOICES
+        },
+        "by_category": [
+            {
+                "id": category["id"],
+                "name": category["name"],
+                "color": category["color"],
+                "notes_count": category["active_notes_count"],
+            }
+            for category in categories
+        ],
+        "uncategorized_notes": counts["uncategorized_notes"],
+    }
+
+
+def get_stats(user):
+    """Return the stats for ``user``, computing and caching them on a miss."""
+    if settings.NOTES_STATS_CACHE is None:
+        return compute_stats(user)
+    cache = caches[settings.NOTES_STATS_CACHE]
+    key = cache_key(cache, user.pk)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(user)
+        cache.set(key, stats, settings.NOTES_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_stats(user_id):
+    """Retire the cached stats for ``user_id`` once the current transaction commits."""
+    if settings.NOTES_STATS_CACHE is None:
+        return
+    cache = caches[settings.NOTES_STATS_CACHE]
+    key = GENERATION_KEY.format(user_id=user_id)
+    transaction.on_commit(lambda: bump_generation(cache, key))
@@ -0,0 +1,92 @@
+"""
+Incrementally written JSON responses for large note lists.
+
+``StreamingJSONListResponse`` serializes one object at a time while it
+iterates a queryset with ``QuerySet.iterator()``, so memory use stays flat no
+matter how many rows are returned: neither the model instances nor the
+rendered list are ever held in full. Objects are encoded by the same
+renderer as other responses (see renderers.py) and sent in chunks of one
+database fetch each, so the output matches what that renderer produces for
+the whole list.
+
+Under ASGI, Django buffers a streaming response whose content is a sync
+iterator into a list before sending any of it. ``streaming_content()``
+therefore hands ASGI requests an async iterator that advances the sync one
+chunk by chunk on the request's thread, where the database connection it
+reads from lives.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .renderers import FastJSONRenderer
+
+# Rows fetched from the database per round trip while streaming
+STREAM_CHUNK_SIZE = 500
+
+
+def json_array_chunks(
+    items, to_representation, renderer=None, chunk_size=STREAM_CHUNK_SIZE
+):
+    """
+    Yield the JSON encoding of ``items`` as a list, ``chunk_size`` elements
+    at a time.
+    """
+    renderer = renderer or FastJSONRenderer()
+    separator = b"," if renderer.compact else b", "
+    yield b"["
+    chunk = []
+    started = False
+    for item in items:
+        chunk.append(renderer.render(to_representation(item)))
+        if len(chunk) == chunk_size:
+            yield (separator if started else b"") + separator.join(chunk)
+            chunk = []
+            started = True
+    if chunk:
+        yield (separator if started else b"") + separator.join(chunk)
+    yield b"]"
+
+
+async def iterate_in_thread(chunks):
+    """Yield the items of the sync iterable ``chunks``, each fetched in a thread."""
+    iterator = iter(chunks)
+    done = object()
+    # thread_sensitive: every step runs on the same thread, the request's
+    fetch = sync_to_async(next)
+    try:
+        while (chunk := await fetch(iterator, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
+
+
+def streaming_content(request, chunks):
+    """``chunks`` in the form ``request``'s handler streams without buffering."""
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return iterate_in_thread(chunks)
+    return chunks
+
+
+class StreamingJSONListResponse(StreamingHttpResponse):
+    """Stream ``queryset`` as a JSON array using ``serializer``'s representation."""
+
+    def __init__(
+        self,
+        request,
+        queryset,
+        serializer,
+        chunk_size=STREAM_CHUNK_SIZE,
+        renderer=None,
+        **kwargs,
+    ):
+        kwargs.setdefault("content_type", "application/json")
+        chunks = json_array_chunks(
+            queryset.iterator(chunk_size=chunk_size),
+            serializer.to_representation,
+            renderer=renderer,
+            chunk_size=chunk_size,
+        )
+        super().__init__(streaming_content(request, chunks), **kwargs)
@@ -0,0 +1,130 @@
+"""
+Incremental sync for ``GET /api/notes/sync/``.
+
+A client keeps the ``cursor`` of its last sync and sends it back as
+``?since=``. The response holds only what changed after it:
+- notes updated after the cursor's note position, oldest first, in pages
+  of NOTES_SYNC_PAGE_SIZE read in ``(updated_at, id)`` order off
+  ``note_user_sync_idx``;
+- categories updated, or whose note count changed, since the cursor's time;
+- the ids of notes and categories deleted since then, from ``Tombstone``.
+
+Every cursor ends NOTES_SYNC_CURSOR_OVERLAP seconds before the request, so
+writes whose transaction was still open at the time are picked up by the
+next sync. Anything in the overlap is sent again; applying a change twice
+is harmless. A cursor older than NOTES_SYNC_TOMBSTONE_DAYS may have lost
+deletions to ``prune_tombstones`` and is refused with 410.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import Category, Tombstone
+
+# Keys of the "deleted" object in sync responses
+DELETED_KEYS = {Tombstone.NOTE: "notes", Tombstone.CATEGORY: "categories"}
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "The sync cursor has expired; sync again without since."
+    default_code = "cursor_expired"
+
+
+def encode_cursor(changed_since, note_position):
+    updated_at, pk = note_position
+    data = {"c": changed_since.isoformat(), "u": updated_at.isoformat(), "i": pk}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(encoded):
+    """Return ``(changed_since, (updated_at, id))`` for a cursor from encode_cursor."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+        return (
+            datetime.fromisoformat(data["c"]),
+            (datetime.fromisoformat(data["u"]), int(data["i"])),
+        )
+    except (binascii.Error, KeyError, TypeError, ValueError, UnicodeError):
+        raise ValidationError({"since": "Invalid cursor"}) from None
+
+
+def notes_after(queryset, position):
+    """The notes of ``queryset`` after ``position``, in sync order."""
+    updated_at, pk = position
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    columns = ", ".join(
+        f"{table}.{connection.ops.quote_name(column)}"
+        for column in ("updated_at", "id")
+    )
+    return queryset.order_by("updated_at", "id").filter(
+        RawSQL(
+            f"({columns}) > (%s, %s)",
+            [connection.ops.adapt_datetimefield_value(updated_at), pk],
+            output_field=BooleanField(),
+        )
+    )
+
+
+def get_changes(user, notes, since=None):
+    """
+    Collect the changes to ``user``'s notes (from the ``notes`` queryset) and
+    categories after the cursor ``since``, or everything when it is None.
+
+    Returns a dict with the ``notes`` and ``categories`` to send, the
+    ``deleted`` ids, the next ``cursor`` and whether more notes remain
+    (``has_more``), in which case the client should sync again right away.
+    """
+    now = timezone.now()
+    categories = Category.objects.filter(user=user).order_by("updated_at")
+    tombstones = Tombstone.objects.filter(user=user).order_by("deleted_at")
+    if since is None:
+        tombstones = tombstones.none()
+        notes = notes.order_by("updated_at", "id")
+    else:
+        changed_since, position = decode_cursor(since)
+        expiry = timedelta(days=settings.NOTES_SYNC_TOMBSTONE_DAYS)
+        if changed_since < now - expiry:
+            raise CursorExpired
+        categories = categories.filter(
+            Q(updated_at__gte=changed_since)
+            | Q(notes_count_updated_at__gte=changed_since)
+        )
+        tombstones = tombstones.filter(deleted_at__gte=changed_since)
+        notes = notes_after(notes, position)
+
+    limit = settings.NOTES_SYNC_PAGE_SIZE
+    page = list(notes[: limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Categories and deletions are sent in full each time, so the next
+    # request only needs those after this one; notes continue after the page.
+    changed_since = now - timedelta(seconds=settings.NOTES_SYNC_CURSOR_OVERLAP)
+    if has_more:
+        position = (page[-1].updated_at, page[-1].pk)
+    else:
+        position = (changed_since, 0)
+
+    deleted = {key: [] for key in DELETED_KEYS.values()}
+    for kind, object_id in tombstones.values_list("kind", "object_id"):
+        deleted[DELETED_KEYS[kind]].append(object_id)
+
+    return {
+        "notes": page,
+        "categories": list(categories),
+        "deleted": deleted,
+        "cursor": encode_cursor(changed_since, position),
+        "has_more": has_more,
+    }
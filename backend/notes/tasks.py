@@ -0,0 +1,110 @@
+"""
+Handlers of the background jobs (see jobs.py).
+
+- ``export``: writes the export file the export action would stream, for
+  ``GET /api/jobs/{id}/download/``.
+- ``import``: imports the uploaded file. A retry resumes after the records
+  the failed attempt committed.
+- ``bulk``: applies a bulk operation, such as a mass delete.
+- ``reindex``: rebuilds the full-text search index.
+"""
+
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework import status
+
+from .bulk import apply_bulk_operation, bulk_summary
+from .export import EXPORT_FORMATS, export_chunks, export_filename
+from .imports import IMPORT_FORMATS, ImportInterrupted, import_notes
+from .jobs import JobFailed, register
+from .models import Category
+from .search import ensure_search_index, get_search_backend
+from .streaming import STREAM_CHUNK_SIZE
+
+
+@register("export")
+def export_notes(job):
+    # views.py queues these jobs, so it cannot be imported before them
+    from .views import NoteViewSet
+
+    notes = NoteViewSet.queryset_for(job.user, job.params["query"], action="export")
+    export = EXPORT_FORMATS[job.params["format"]]()
+    total = notes.count()
+    job.report_progress(notes=0, total=total)
+
+    def counted(notes):
+        for count, note in enumerate(notes, 1):
+            if count % STREAM_CHUNK_SIZE == 0:
+                job.report_progress(notes=count, total=total)
+            yield note
+
+    filename = export_filename(export)
+    with tempfile.TemporaryFile() as file:
+        for chunk in export_chunks(
+            counted(notes.iterator(chunk_size=STREAM_CHUNK_SIZE)), export
+        ):
+            file.write(chunk)
+        job.output_file.save(filename, File(file), save=False)
+    return {"notes": total, "filename": filename, "content_type": export.content_type}
+
+
+@register("import")
+def import_file(job):
+    # What earlier attempts committed, which this one carries on from
+    done = job.progress or {
+        "records": job.params.get("resume_from", 0),
+        "imported": 0,
+        "skipped": 0,
+        "errors": [],
+    }
+
+    def combined(result):
+        return {
+            "records": result["records"],
+            "imported": done["imported"] + result["imported"],
+            "skipped": done["skipped"] + result["skipped"],
+            "errors": [*done["errors"], *result["errors"]][
+                : settings.NOTES_IMPORT_MAX_ERRORS
+            ],
+        }
+
+    read = IMPORT_FORMATS[job.params["format"]]
+    try:
+        with job.input_file.open("rb") as file:
+            result = import_notes(
+                job.user,
+                read(file),
+                resume_from=done["records"],
+                progress=lambda result: job.report_progress(**combined(result)),
+            )
+    except ImportInterrupted as exc:
+        if exc.status_code == status.HTTP_400_BAD_REQUEST:
+            raise JobFailed(exc.detail["detail"]) from exc
+        raise
+    return combined(result)
+
+
+@register("bulk")
+def bulk_operation(job):
+    operation = job.params["operation"]
+    category = None
+    if job.params.get("category") is not None:
+        category = Category.objects.filter(
+            user=job.user, pk=job.params["category"]
+        ).first()
+        if category is None:
+            raise JobFailed("The category no longer exists.")
+    results = apply_bulk_operation(
+        job.user, job.params["ids"], operation, category=category
+    )
+    return bulk_summary(operation, results)
+
+
+@register("reindex", max_attempts=1)
+def rebuild_search_index(job):
+    alias = job.params.get("database", DEFAULT_DB_ALIAS)
+    ensure_search_index(connections[alias], rebuild=True)
+    return {"backend": type(get_search_backend(alias)).__name__}
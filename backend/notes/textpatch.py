@@ -0,0 +1,41 @@
+"""
+Apply insert/delete edit operations to note content.
+
+Positions and counts are measured in UTF-16 code units, the unit JavaScript
+string indices use, so a browser can compute them from ``String.length`` and
+``slice`` without any conversion. The text is edited as UTF-16 so the
+offsets apply directly; an edit that splits a surrogate pair is rejected.
+"""
+
+ENCODING = "utf-16-le"
+UNIT = 2  # Bytes per UTF-16 code unit
+
+
+class PatchError(ValueError):
+    pass
+
+
+def apply_ops(text, ops):
+    """
+    Return ``text`` with ``ops`` applied in order.
+
+    Each op is ``{"op": "insert", "pos": n, "text": "..."}`` or
+    ``{"op": "delete", "pos": n, "count": n}``; positions refer to the text as
+    left by the previous op.
+    """
+    buffer = bytearray(text.encode(ENCODING))
+    for index, op in enumerate(ops):
+        start = op["pos"] * UNIT
+        if start > len(buffer):
+            raise PatchError(f"Op {index}: position {op['pos']} is past the end.")
+        if op["op"] == "insert":
+            buffer[start:start] = op["text"].encode(ENCODING)
+        else:
+            end = start + op["count"] * UNIT
+            if end > len(buffer):
+                raise PatchError(f"Op {index}: deletes past the end.")
+            del buffer[start:end]
+    try:
+        return buffer.decode(ENCODING)
+    except UnicodeDecodeError:
+        raise PatchError("Edits split a surrogate pair.") from None
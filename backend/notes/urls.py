@@ -2,14 +2,20 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .auth_views import signup, user_profile
-from .views import CategoryViewSet, NoteViewSet
+from .events import events_ticket, events_view
+from .instrumentation import metrics_view
+from .views import CategoryViewSet, JobViewSet, NoteViewSet
 
 router = DefaultRouter()
 router.register(r"notes", NoteViewSet, basename="note")
 router.register(r"categories", CategoryViewSet, basename="category")
+router.register(r"jobs", JobViewSet, basename="job")
 
 urlpatterns = [
     path("api/auth/signup/", signup, name="signup"),
     path("api/auth/profile/", user_profile, name="user_profile"),
+    path("api/metrics", metrics_view, name="metrics"),
+    path("api/events/", events_view, name="events"),
+    path("api/events/ticket/", events_ticket, name="events-ticket"),
     path("api/", include(router.urls)),
 ]
@@ -1,13 +1,86 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Substr
+from django.http import FileResponse, HttpRequest, QueryDict
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
-from rest_framework import filters, viewsets
+from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
 from rest_framework.response import Response
 
-from .models import Category, Note
-from .serializers import CategorySerializer, NoteListSerializer, NoteSerializer
+from .async_reads import AsyncReadsMixin
+from .bulk import apply_bulk_operation, bulk_summary
+from .conditional import (
+    check_read_preconditions,
+    check_write_preconditions,
+    current_etag,
+    etag_for_note,
+    list_etag,
+    page_etag,
+    set_etag,
+)
+from .export import EXPORT_FORMATS, export_response
+from .filters import NoteOrderingFilter, filter_by_tags
+from .imports import IMPORT_FORMATS, format_for_filename, import_notes
+from .jobs import enqueue
+from .models import Category, Job, Note
+from .pagination import NoteKeysetPagination
+from .response_cache import CachedReadsMixin
+from .search import get_search_backend
+from .serializers import (
+    CategorySerializer,
+    JobSerializer,
+    NoteBulkSerializer,
+    NoteContentPatchSerializer,
+    NoteListSerializer,
+    NoteSerializer,
+)
+from .stats import get_stats
+from .streaming import StreamingJSONListResponse
+from .sync import get_changes
+from .textpatch import PatchError, apply_ops
+
+# Characters of note content returned as content_preview in list responses
+CONTENT_PREVIEW_LENGTH = 200
+
+STREAM_PARAMETER = OpenApiParameter(
+    "stream",
+    bool,
+    description="Set to true to receive every matching note (up to the server's "
+    "limit, sent in the X-Result-Limit header) as one JSON array written "
+    "incrementally, instead of a page.",
+)
+
+BACKGROUND_PARAMETER = OpenApiParameter(
+    "background",
+    bool,
+    description="Set to true to run the operation as a background job: the "
+    "response is 202 with the job, to follow at /api/jobs/{id}/. Without it, "
+    "large operations run as jobs too; set to false to keep them inline.",
+)
+
+
+def background_requested(value):
+    """The request's ``background`` value as a bool, or None when not given."""
+    if value is None or value == "":
+        return None
+    return value is True or value == "true"
+
+
+def job_accepted(request, job):
+    """202 Accepted for ``job``, queued to do the request's work."""
+    # Not DRF's reverse(), which would carry export's ?format= over
+    url = request.build_absolute_uri(reverse("job-detail", args=[job.pk]))
+    return Response(
+        JobSerializer(job, context={"request": request}).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": url},
+    )
 
 
 @extend_schema_view(
@@ -44,7 +117,7 @@ from .serializers import CategorySerializer, NoteListSerializer, NoteSerializer
         description="Delete a category owned by the authenticated user. Notes in this category will have their category set to null.",
     ),
 )
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedReadsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing user-specific categories.
 
@@ -61,6 +134,14 @@ class CategoryViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        list_categories = super().list
+        return self.cached_response(lambda: list_categories(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        retrieve = super().retrieve
+        return self.cached_response(lambda: retrieve(request, *args, **kwargs))
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -91,16 +172,31 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 "is_archived", bool, description="Filter by archived status"
             ),
             OpenApiParameter(
-                "search", str, description="Search in title, content, and tags"
+                "search",
+                str,
+                description="Full-text search in title, content, and tags. "
+                "Results are ranked by relevance and include a highlighted snippet.",
             ),
             OpenApiParameter(
                 "tags", str, description="Filter by tags (comma-separated)"
             ),
+            OpenApiParameter(
+                "tags_match",
+                str,
+                description="Require all tags (all, default) or any of them (any)",
+            ),
             OpenApiParameter(
                 "ordering",
                 str,
                 description="Order by: title, created_at, updated_at, priority (add - for desc)",
             ),
+            OpenApiParameter(
+                "fields",
+                str,
+                description="Comma-separated fields to return. Full note content is "
+                "only included when requested here; by default each note carries "
+                "a content_preview instead.",
+            ),
         ],
     ),
     create=extend_schema(
@@ -124,7 +220,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         description="Delete a note owned by the authenticated user.",
     ),
 )
-class NoteViewSet(viewsets.ModelViewSet):
+class NoteViewSet(AsyncReadsMixin, CachedReadsMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing user-specific notes.
 
@@ -133,49 +229,110 @@ class NoteViewSet(viewsets.ModelViewSet):
     their own notes.
     """
 
-    filter_backends = [
-        DjangoFilterBackend,
-        filters.SearchFilter,
-        filters.OrderingFilter,
-    ]
+    filter_backends = [DjangoFilterBackend, NoteOrderingFilter]
     filterset_fields = ["category", "priority", "is_pinned", "is_archived"]
-    search_fields = ["title", "content", "tags"]
     ordering_fields = ["title", "created_at", "updated_at", "priority"]
     ordering = ["-is_pinned", "-updated_at"]
 
+    # Actions that return many notes through NoteListSerializer
+    list_actions = ["list", "archived", "pinned", "sync"]
+    # Actions that write a single note without needing its stored content
+    write_actions = ["update", "partial_update", "toggle_pin", "toggle_archive"]
+    # Actions that lock the note's row (see get_object_for_write)
+    locking_actions = [*write_actions, "patch_content", "destroy"]
+    # Read actions run on the read thread pool under ASGI (see async_reads.py)
+    async_read_actions = [*list_actions, "retrieve", "stats"]
+
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in self.list_actions:
             return NoteListSerializer
         return NoteSerializer
 
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        print(f"LIST API: Returning {len(response.data.get('results', []))} notes")
-        for note in response.data.get('results', [])[:2]:  # Show first 2 notes
-            print(f"LIST API: Note {note.get('id')}: title='{note.get('title')}', content='{note.get('content', 'NOT_PRESENT')[:50]}...'")
-        return response
+    @property
+    def paginator(self):
+        """Keyset pagination when the request asks for it, page numbers otherwise."""
+        if not hasattr(self, "_paginator") and NoteKeysetPagination.is_requested(
+            self.request
+        ):
+            self._paginator = NoteKeysetPagination()
+        return super().paginator
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.list_actions:
+            kwargs.setdefault("fields", self.get_list_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_list_fields(self):
+        """Fields requested with ?fields=, or the list defaults."""
+        available = NoteListSerializer.Meta.fields
+        requested = self.request.query_params.get("fields")
+        if not requested:
+            return [
+                field
+                for field in available
+                if field not in NoteListSerializer.opt_in_fields
+            ]
+        fields = [field.strip() for field in requested.split(",") if field.strip()]
+        unknown = sorted(set(fields) - set(available))
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(unknown)}"})
+        return fields
 
     def get_queryset(self):
-        queryset = Note.objects.filter(user=self.request.user)
+        queryset = Note.objects.filter(user=self.request.user).select_related(
+            "category"
+        )
 
-        # Filter by search query across multiple fields
+        # Full-text search across title, content and tags
         search = self.request.query_params.get("search", None)
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search)
-                | Q(content__icontains=search)
-                | Q(tags__icontains=search)
-            )
+            queryset = get_search_backend(queryset.db).search(queryset, search)
 
-        # Filter by tags
+        # Filter by tags, requiring all of them unless tags_match=any
         tags = self.request.query_params.get("tags", None)
         if tags:
-            tag_list = [tag.strip() for tag in tags.split(",")]
-            for tag in tag_list:
-                queryset = queryset.filter(tags__icontains=tag)
+            queryset = filter_by_tags(
+                queryset,
+                self.request.user,
+                [tag.strip() for tag in tags.split(",")],
+                match_all=self.request.query_params.get("tags_match") != "any",
+            )
+
+        # Writes compare content by hash (see NoteSerializer.update) and only
+        # load the stored body if the response needs it
+        if self.action in self.write_actions:
+            queryset = queryset.defer("content")
+        if self.action in self.locking_actions:
+            queryset = queryset.select_for_update(of=("self",))
+
+        # List pages leave the unbounded content column in the database unless
+        # it is asked for, and send a preview computed by the database instead
+        if self.action in self.list_actions:
+            fields = self.get_list_fields()
+            if "content" not in fields:
+                queryset = queryset.defer("content")
+            if "content_preview" in fields:
+                queryset = queryset.annotate(
+                    content_preview=Substr("content", 1, CONTENT_PREVIEW_LENGTH)
+                )
 
         return queryset
 
+    @classmethod
+    def queryset_for(cls, user, query_params, action="list"):
+        """
+        The notes ``action`` would read for ``user`` given ``query_params``
+        (``{name: [values]}``), outside a request, as background jobs need.
+        """
+        http_request = HttpRequest()
+        http_request.GET = QueryDict(mutable=True)
+        for name, values in query_params.items():
+            http_request.GET.setlist(name, values)
+        request = Request(http_request)
+        request.user = user
+        view = cls(request=request, action=action, format_kwarg=None, kwargs={})
+        return view.filter_queryset(view.get_queryset())
+
     def get_serializer_context(self):
         """Ensure request is available in serializer context"""
         context = super().get_serializer_context()
@@ -185,6 +342,67 @@ class NoteViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_object_for_write(self):
+        """
+        get_object() for a write, inside the caller's transaction: the row stays
+        locked until it commits, and If-Match is checked against the locked
+        version so concurrent writers cannot both pass.
+        """
+        note = self.get_object()
+        check_write_preconditions(self.request, etag_for_note(note))
+        return note
+
+    def list(self, request, *args, **kwargs):
+        def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            if request.query_params.get("stream") == "true":
+                etag = list_etag(request, queryset)
+                not_modified = check_read_preconditions(request, etag)
+                if not_modified is not None:
+                    return not_modified
+                return set_etag(self.list_response(queryset), etag)
+
+            # The page is loaded before its ETag is known, but a 304 still
+            # skips serializing it
+            page = self.paginate_queryset(queryset)
+            metadata = self.get_paginated_response([]).data
+            del metadata["results"]
+            etag = page_etag(request, page, metadata)
+            not_modified = check_read_preconditions(request, etag)
+            if not_modified is not None:
+                return not_modified
+            serializer = self.get_serializer(page, many=True)
+            return set_etag(self.get_paginated_response(serializer.data), etag)
+
+        return self.cached_response(build)
+
+    def retrieve(self, request, *args, **kwargs):
+        retrieve = super().retrieve
+
+        def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            etag = current_etag(queryset, kwargs["pk"])
+            if etag is not None:
+                not_modified = check_read_preconditions(request, etag)
+                if not_modified is not None:
+                    return not_modified
+            return set_etag(retrieve(request, *args, **kwargs), etag)
+
+        return self.cached_response(build)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        with transaction.atomic():
+            note = self.get_object_for_write()
+            serializer = self.get_serializer(note, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return set_etag(Response(serializer.data), etag_for_note(note))
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            self.perform_destroy(self.get_object_for_write())
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(
         summary="Toggle note pin status",
@@ -202,16 +420,18 @@ class NoteViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=["post"])
     def toggle_pin(self, request, pk=None):
-        note = self.get_object()
-        note.is_pinned = not note.is_pinned
-        note.save()
-        return Response(
+        with transaction.atomic():
+            note = self.get_object_for_write()
+            note.is_pinned = not note.is_pinned
+            note.save(update_fields=["is_pinned", "updated_at"])
+        response = Response(
             {
                 "id": note.id,
                 "is_pinned": note.is_pinned,
                 "message": f"Note {'pinned' if note.is_pinned else 'unpinned'} successfully",
             }
         )
+        return set_etag(response, etag_for_note(note))
 
     @extend_schema(
         summary="Toggle note archive status",
@@ -229,46 +449,380 @@ class NoteViewSet(viewsets.ModelViewSet):
     )
     @action(detail=True, methods=["post"])
     def toggle_archive(self, request, pk=None):
-        note = self.get_object()
-        note.is_archived = not note.is_archived
-        note.save()
-        return Response(
+        with transaction.atomic():
+            note = self.get_object_for_write()
+            note.is_archived = not note.is_archived
+            note.save(update_fields=["is_archived", "updated_at"])
+        response = Response(
             {
                 "id": note.id,
                 "is_archived": note.is_archived,
                 "message": f"Note {'archived' if note.is_archived else 'unarchived'} successfully",
             }
         )
+        return set_etag(response, etag_for_note(note))
+
+    @extend_schema(
+        summary="Edit note content",
+        description="Apply insert/delete edits to the note's content without "
+        "resending it. Edits are made against the content whose hash is "
+        "base_hash; if the note has changed since, nothing is applied and 409 "
+        "is returned with the current content_hash.",
+        request=NoteContentPatchSerializer,
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "version": {"type": "integer"},
+                    "content_hash": {"type": "string"},
+                    "updated_at": {"type": "string", "format": "date-time"},
+                },
+            },
+            409: {
+                "type": "object",
+                "properties": {
+                    "detail": {"type": "string"},
+                    "content_hash": {"type": "string"},
+                },
+            },
+        },
+    )
+    @action(detail=True, methods=["patch"], url_path="content")
+    def patch_content(self, request, pk=None):
+        serializer = NoteContentPatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            note = self.get_object_for_write()
+            if note.content_hash != serializer.validated_data["base_hash"]:
+                return Response(
+                    {
+                        "detail": "The note has changed since base_hash.",
+                        "content_hash": note.content_hash,
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            try:
+                content = apply_ops(note.content, serializer.validated_data["ops"])
+            except PatchError as exc:
+                raise ValidationError({"ops": str(exc)}) from None
+            if content != note.content:
+                note.content = content
+                note.save(update_fields=["content", "updated_at"])
+        response = Response(
+            {
+                "id": note.id,
+                "version": note.version,
+                "content_hash": note.content_hash,
+                "updated_at": note.updated_at,
+            }
+        )
+        return set_etag(response, etag_for_note(note))
+
+    @extend_schema(
+        summary="Apply an operation to many notes",
+        description="Pin, unpin, archive, unarchive, delete or move (set_category) "
+        "up to NOTES_BULK_MAX_IDS notes in one transaction. Returns a status per "
+        "id: updated, deleted, or not_found for ids the user does not own. "
+        "With background, or above NOTES_BULK_BACKGROUND_IDS ids unless it is "
+        "false, the operation runs as a job and its result is the job's.",
+        request=NoteBulkSerializer,
+        responses={
+            202: JobSerializer,
+            200: {
+                "type": "object",
+                "properties": {
+                    "operation": {"type": "string"},
+                    "processed": {"type": "integer"},
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "id": {"type": "integer"},
+                                "status": {
+                                    "type": "string",
+                                    "enum": ["updated", "deleted", "not_found"],
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        serializer = NoteBulkSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        operation = serializer.validated_data["operation"]
+        category = serializer.validated_data.get("category")
+        ids = serializer.validated_data["ids"]
+        background = background_requested(serializer.validated_data["background"])
+        if background is None:
+            threshold = settings.NOTES_BULK_BACKGROUND_IDS
+            background = threshold is not None and len(ids) > threshold
+        if background:
+            params = {
+                "ids": ids,
+                "operation": operation,
+                "category": category.pk if category is not None else None,
+            }
+            return job_accepted(request, enqueue("bulk", request.user, params))
+        results = apply_bulk_operation(request.user, ids, operation, category=category)
+        return Response(bulk_summary(operation, results))
 
     @extend_schema(
         summary="List archived notes",
         description="Get all archived notes for the authenticated user.",
+        parameters=[STREAM_PARAMETER],
         responses={200: NoteListSerializer(many=True)},
     )
     @action(detail=False, methods=["get"])
     def archived(self, request):
         archived_notes = self.get_queryset().filter(is_archived=True)
-        page = self.paginate_queryset(archived_notes)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(archived_notes, many=True)
-        return Response(serializer.data)
+        return self.cached_response(lambda: self.list_response(archived_notes))
 
     @extend_schema(
         summary="List pinned notes",
-        description="Get all pinned notes for the authenticated user.",
+        description="Get the authenticated user's pinned notes, paginated like the "
+        "notes list.",
+        parameters=[STREAM_PARAMETER],
         responses={200: NoteListSerializer(many=True)},
     )
     @action(detail=False, methods=["get"])
     def pinned(self, request):
         pinned_notes = self.get_queryset().filter(is_pinned=True)
-        serializer = self.get_serializer(pinned_notes, many=True)
+        return self.cached_response(lambda: self.list_response(pinned_notes))
+
+    def list_response(self, queryset):
+        """
+        Respond with one page of ``queryset``, or with all of it (up to
+        NOTES_STREAM_MAX_RESULTS notes) written incrementally for ?stream=true.
+        """
+        if self.request.query_params.get("stream") == "true":
+            limit = settings.NOTES_STREAM_MAX_RESULTS
+            return StreamingJSONListResponse(
+                self.request,
+                queryset[:limit],
+                self.get_serializer(),
+                headers={"X-Result-Limit": str(limit)},
+            )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @extend_schema(
+        summary="Sync changes since a cursor",
+        description="Return the notes and categories created or updated, and the "
+        "ids of those deleted, since the cursor from the previous sync. Without "
+        "since, every note and category is returned. Notes come in pages of up "
+        "to NOTES_SYNC_PAGE_SIZE; when has_more is true, sync again with the "
+        "new cursor. A cursor older than NOTES_SYNC_TOMBSTONE_DAYS is refused "
+        "with 410, after which the client should sync from scratch.",
+        parameters=[
+            OpenApiParameter(
+                "since", str, description="Cursor returned by the previous sync"
+            ),
+            OpenApiParameter(
+                "fields",
+                str,
+                description="Comma-separated note fields to return, as for the "
+                "notes list.",
+            ),
+        ],
+        responses={
+            200: {
+                "type": "object",
+                "properties": {
+                    "notes": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/NoteList"},
+                    },
+                    "categories": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/Category"},
+                    },
+                    "deleted": {
+                        "type": "object",
+                        "properties": {
+                            "notes": {"type": "array", "items": {"type": "integer"}},
+                            "categories": {
+                                "type": "array",
+                                "items": {"type": "integer"},
+                            },
+                        },
+                    },
+                    "cursor": {"type": "string"},
+                    "has_more": {"type": "boolean"},
+                },
+            }
+        },
+    )
+    @action(detail=False, methods=["get"])
+    def sync(self, request):
+        changes = get_changes(
+            request.user, self.get_queryset(), request.query_params.get("since")
+        )
+        return Response(
+            {
+                **changes,
+                "notes": self.get_serializer(changes["notes"], many=True).data,
+                "categories": CategorySerializer(changes["categories"], many=True).data,
+            }
+        )
+
+    @extend_schema(
+        summary="Export notes",
+        description="Download every note matching the list filters, with its "
+        "category and tags, written while the notes are read from the database. "
+        "jsonl has one JSON object per line; csv one row per note; markdown-zip "
+        "a zip archive with a Markdown file per note in a folder per category, "
+        "with its metadata as YAML front matter. Exports of more than "
+        "NOTES_EXPORT_BACKGROUND_NOTES notes run as a background job unless "
+        "background is false.",
+        parameters=[
+            OpenApiParameter("format", str, enum=[*EXPORT_FORMATS], default="jsonl"),
+            BACKGROUND_PARAMETER,
+        ],
+        responses={
+            (202, "application/json"): JobSerializer,
+            **{
+                (200, export.content_type): OpenApiTypes.BINARY
+                for export in EXPORT_FORMATS.values()
+            },
+        },
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        export_format = request.query_params.get("format", "jsonl")
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError(
+                {"format": f"Choose one of: {', '.join(EXPORT_FORMATS)}."}
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        background = background_requested(request.query_params.get("background"))
+        if background is None:
+            threshold = settings.NOTES_EXPORT_BACKGROUND_NOTES
+            # Whether there are more than threshold notes, without counting them
+            background = (
+                threshold is not None
+                and queryset.order_by()[threshold : threshold + 1].exists()
+            )
+        if background:
+            query = {
+                name: values
+                for name, values in request.query_params.lists()
+                if name not in ("format", "background")
+            }
+            params = {"format": export_format, "query": query}
+            return job_accepted(request, enqueue("export", request.user, params))
+        return export_response(request, queryset, export_format)
+
+    @extend_schema(
+        summary="Import notes",
+        description="Create notes from an uploaded file in one of the export "
+        "formats. Records are validated one at a time and written in batches of "
+        "NOTES_IMPORT_BATCH_SIZE, each batch in its own transaction; categories "
+        "are matched by name and created when missing. Invalid records are "
+        "skipped and reported. If the import stops part way, the error gives "
+        "resume_from: send the same file again with it to skip the records "
+        "already imported.",
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string", "format": "binary"},
+                    "format": {
+                        "type": "string",
+                        "enum": [*IMPORT_FORMATS],
+                        "description": "Defaults to the one the file name suggests.",
+                    },
+                    "resume_from": {"type": "integer", "minimum": 0},
+                    "background": {
+                        "type": "boolean",
+                        "description": "Import in a background job; the "
+                        "response is 202 with the job. Defaults to true for "
+                        "files over NOTES_IMPORT_BACKGROUND_BYTES.",
+                    },
+                },
+                "required": ["file"],
+            }
+        },
+        responses={
+            202: JobSerializer,
+            200: {
+                "type": "object",
+                "properties": {
+                    "records": {"type": "integer"},
+                    "imported": {"type": "integer"},
+                    "skipped": {"type": "integer"},
+                    "errors": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "record": {"type": "integer"},
+                                "errors": {"type": "object"},
+                            },
+                        },
+                    },
+                },
+            },
+        },
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        url_name="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_file(self, request):
+        upload = request.data.get("file")
+        if upload is None or isinstance(upload, str):
+            raise ValidationError({"file": "Upload the file to import."})
+        import_format = request.data.get("format") or format_for_filename(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            raise ValidationError(
+                {"format": f"Choose one of: {', '.join(IMPORT_FORMATS)}."}
+            )
+        try:
+            resume_from = int(request.data.get("resume_from") or 0)
+        except ValueError:
+            resume_from = -1
+        if resume_from < 0:
+            raise ValidationError({"resume_from": "Expected a record number."})
+        background = background_requested(request.data.get("background"))
+        if background is None:
+            threshold = settings.NOTES_IMPORT_BACKGROUND_BYTES
+            background = threshold is not None and upload.size > threshold
+        if background:
+            params = {"format": import_format, "resume_from": resume_from}
+            job = enqueue("import", request.user, params, input_file=upload)
+            return job_accepted(request, job)
+        result = import_notes(
+            request.user,
+            IMPORT_FORMATS[import_format](upload),
+            resume_from=resume_from,
+        )
+        return Response(result)
+
+    def perform_content_negotiation(self, request, force=False):
+        # export's ?format= names a file format, not one of the renderers
+        if self.action == "export":
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     @extend_schema(
         summary="Get user statistics",
-        description="Get statistical information about user's notes and categories.",
+        description="Get statistical information about user's notes and categories. "
+        "Priority and category breakdowns count active (unarchived) notes.",
         responses={
             200: {
                 "type": "object",
@@ -278,25 +832,67 @@ class NoteViewSet(viewsets.ModelViewSet):
                     "pinned_notes": {"type": "integer"},
                     "archived_notes": {"type": "integer"},
                     "categories_count": {"type": "integer"},
+                    "by_priority": {
+                        "type": "object",
+                        "properties": {
+                            value: {"type": "integer"}
+                            for value, _label in Note.PRIORITY_CHOICES
+                        },
+                    },
+                    "by_category": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "id": {"type": "integer"},
+                                "name": {"type": "string"},
+                                "color": {"type": "string"},
+                                "notes_count": {"type": "integer"},
+                            },
+                        },
+                    },
+                    "uncategorized_notes": {"type": "integer"},
                 },
             }
         },
     )
     @action(detail=False, methods=["get"])
     def stats(self, request):
-        total_notes = self.get_queryset().count()
-        active_notes = self.get_queryset().filter(is_archived=False).count()
-        pinned_notes = self.get_queryset().filter(is_pinned=True).count()
-        archived_notes = self.get_queryset().filter(is_archived=True).count()
+        return Response(get_stats(request.user))
 
-        return Response(
-            {
-                "total_notes": total_notes,
-                "active_notes": active_notes,
-                "pinned_notes": pinned_notes,
-                "archived_notes": archived_notes,
-                "categories_count": Category.objects.filter(
-                    user=self.request.user
-                ).count(),
-            }
+
+@extend_schema_view(
+    list=extend_schema(
+        summary="List background jobs",
+        description="The authenticated user's background jobs, newest first.",
+    ),
+    retrieve=extend_schema(
+        summary="Get a background job",
+        description="A job's status (queued, running, succeeded or failed), its "
+        "progress while it runs, and its result or error once it finishes.",
+    ),
+)
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of the background jobs queued by the user's requests."""
+
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    @extend_schema(
+        summary="Download a job's file",
+        description="The file an export job wrote. 404 until the job succeeds.",
+        responses={(200, "application/octet-stream"): OpenApiTypes.BINARY},
+    )
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED or not job.output_file:
+            raise NotFound("This job has no file to download.")
+        return FileResponse(
+            job.output_file.open("rb"),
+            as_attachment=True,
+            filename=job.result["filename"],
+            content_type=job.result["content_type"],
         )
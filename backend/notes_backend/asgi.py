@@ -2,6 +2,9 @@
 ASGI config for notes_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through it (e.g. ``uvicorn notes_backend.asgi:application``)
+for the server-sent change events at ``/api/events/``, which hold no thread
+while a connection is idle.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +15,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "notes_backend.settings")
+# Sync views run in a new thread per request under ASGI, so a connection kept
+# for later requests of its thread is never reused, only left open until the
+# database drops it. Close each at the end of its request instead; pool
+# PostgreSQL connections (DATABASE_POOL) to reuse them.
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+# Hash passwords on a bounded pool rather than one thread per request
+os.environ.setdefault("NOTES_PASSWORD_POOL", "1")
 
 application = get_asgi_application()
@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "notes.instrumentation.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -78,12 +82,14 @@ WSGI_APPLICATION = "notes_backend.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# Configured from the environment (DATABASE_URL, DATABASE_CONN_MAX_AGE,
+# DATABASE_POOL, SQLITE_*; see notes_backend/database.py). Without any, SQLite
+# at db.sqlite3 in WAL mode, with connections kept for 60 seconds under WSGI.
+# asgi.py defaults DATABASE_CONN_MAX_AGE to 0: its per-request threads never
+# reuse a kept connection, so use DATABASE_POOL on PostgreSQL instead.
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_settings(BASE_DIR),
 }
 
 
@@ -106,6 +112,17 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing (see notes/passwords.py). Django's defaults, except that
+# pbkdf2_sha256 hashes use NOTES_PASSWORD_ITERATIONS.
+PASSWORD_HASHERS = [
+    "notes.passwords.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -131,20 +148,134 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Django REST Framework configuration
 REST_FRAMEWORK = {
+    # simplejwt's JWTAuthentication, remembering verified tokens
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "notes.authentication.CachedJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # JSONRenderer's output, encoded by orjson when it is installed
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "notes.renderers.FastJSONRenderer",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "notes.pagination.NotePageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Cache
+# Per-process memory cache; point this at a shared backend (Redis, memcached)
+# when running several server processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+# A Redis server shared by all server processes, e.g. redis://127.0.0.1:6379/0
+# (needs the redis extra: uv sync --extra redis). It holds the cached read responses and stats.
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# Notes API limits
+NOTES_MAX_PAGE_SIZE = 100  # Largest ?page_size= accepted by paginated lists
+NOTES_STREAM_MAX_RESULTS = 10000  # Most notes written by a ?stream=true response
+# CACHES alias holding /api/notes/stats/ results; shared, as for responses below
+NOTES_STATS_CACHE = "shared" if REDIS_URL else None
+NOTES_STATS_CACHE_TIMEOUT = 300  # Seconds /api/notes/stats/ results stay cached
+# CACHES alias holding cached read responses (see notes/response_cache.py).
+# Writes invalidate them through the cache, so it must be shared by every
+# server process; None, the default without REDIS_URL, caches nothing.
+NOTES_RESPONSE_CACHE = "shared" if REDIS_URL else None
+NOTES_RESPONSE_CACHE_TIMEOUT = 300  # Seconds a cached read response is kept
+NOTES_BULK_MAX_IDS = 1000  # Most note ids accepted by /api/notes/bulk/
+NOTES_CONTENT_PATCH_MAX_OPS = 1000  # Most edit ops per /api/notes/{id}/content/
+NOTES_SYNC_PAGE_SIZE = 500  # Most notes per /api/notes/sync/ response
+NOTES_SYNC_TOMBSTONE_DAYS = 30  # Days deletions are kept; older cursors get 410
+NOTES_SYNC_CURSOR_OVERLAP = 5  # Seconds each sync re-covers for in-flight writes
+NOTES_IMPORT_BATCH_SIZE = 500  # Notes inserted per transaction by imports
+NOTES_IMPORT_MAX_ERRORS = 100  # Invalid records an import reports in detail
+
+# Async note reads pool (see notes/async_reads.py), off unless
+# NOTES_ASYNC_READS=1. Only for ASGI deployments, and only where
+# `manage.py benchmark_reads` shows a gain: on the reference benchmark they were
+# slower than the plain per-request threads (64 vs 80 req/s under WSGI).
+NOTES_ASYNC_READS = os.environ.get("NOTES_ASYNC_READS") == "1"
+NOTES_READ_THREADS = 16  # Threads serving note reads under ASGI
+# Password hashing pool (see notes/passwords.py); asgi.py turns it on, as
+# NOTES_PASSWORD_POOL=1 does.
+NOTES_PASSWORD_POOL = os.environ.get("NOTES_PASSWORD_POOL") == "1"
+NOTES_PASSWORD_THREADS = 4  # Threads hashing passwords (signup, login) under ASGI
+
+# Signups (see notes/auth_views.py and notes/passwords.py)
+# PBKDF2 iterations per password hash; Django 5.2's default. Lowering it makes
+# signups and logins cheaper and passwords cheaper to crack; stored passwords
+# are rehashed with the new count as their users log in.
+NOTES_PASSWORD_ITERATIONS = int(os.environ.get("NOTES_PASSWORD_ITERATIONS", 1_000_000))
+# Categories every new user starts with
+NOTES_DEFAULT_CATEGORIES = [
+    {"name": "Random Thoughts", "color": "#FF6B6B"},
+    {"name": "School", "color": "#4ECDC4"},
+    {"name": "Personal", "color": "#45B7D1"},
+]
+
+# Change notifications at /api/events/ (see notes/events.py)
+# Class that carries events to connections; the default only reaches those
+# held by the process that made the write.
+NOTES_EVENTS_BROKER = "notes.events.InProcessBroker"
+NOTES_EVENTS_HEARTBEAT = 15  # Seconds between keepalive comments
+NOTES_EVENTS_QUEUE_SIZE = 100  # Events buffered per connection before a resync
+NOTES_EVENTS_TICKET_TIMEOUT = 30  # Seconds a stream ticket stays redeemable
+
+# Request instrumentation (see notes/instrumentation.py)
+# False removes the metrics middleware entirely and disables /api/metrics.
+NOTES_METRICS_ENABLED = True
+# /api/metrics requires "Authorization: Bearer <token>"; it is a 404 until a
+# token is set.
+NOTES_METRICS_TOKEN = os.environ.get("NOTES_METRICS_TOKEN", "")
+# One JSON line per request on stderr (the notes.requests logger); off unless
+# NOTES_REQUEST_LOG=1.
+NOTES_REQUEST_LOG = os.environ.get("NOTES_REQUEST_LOG") == "1"
+
+# Background jobs (see notes/jobs.py), run by `manage.py run_jobs`
+NOTES_JOBS_PROCESSES = 2  # Jobs each run_jobs worker runs at once
+NOTES_JOBS_POLL_INTERVAL = 1.0  # Seconds between queue scans while idle
+NOTES_JOBS_RETRY_DELAY = 30  # Seconds before a failed job's first retry; doubles
+NOTES_JOBS_STALE_AFTER = 300  # Seconds without a heartbeat before a job is retried
+NOTES_JOBS_KEEP_DAYS = 7  # Days finished jobs and their files are kept
+# Requests that do not pass `background` run as jobs above these sizes, so a
+# deployment that serves the API must run a worker too. None keeps them inline.
+NOTES_EXPORT_BACKGROUND_NOTES = 5000  # Notes matched by an export
+NOTES_IMPORT_BACKGROUND_BYTES = 5 * 2**20  # Bytes of an uploaded import file
+NOTES_BULK_BACKGROUND_IDS = 200  # Ids in a bulk operation
+
+# Job input and output files. They are only sent through
+# /api/jobs/{id}/download/, never served from MEDIA_URL.
+MEDIA_ROOT = BASE_DIR / "media"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "notes.instrumentation.JSONLogFormatter"},
+    },
+    "handlers": {
+        "request_log": {"class": "logging.StreamHandler", "formatter": "json"},
+    },
+    "loggers": {
+        # One line per request with its timing and query counts
+        "notes.requests": {
+            "handlers": ["request_log"],
+            "level": "INFO" if NOTES_REQUEST_LOG else "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 # JWT Settings
 
 SIMPLE_JWT = {
@@ -153,6 +284,12 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
 }
 
+# Verified access tokens kept per process (see notes/authentication.py)
+NOTES_AUTH_CACHE_SIZE = 10000  # Tokens remembered; least recently used go first
+# Seconds a verified token is trusted without a look at its user; how long a
+# user deactivated through another process can keep using their tokens
+NOTES_AUTH_CACHE_TIMEOUT = 300
+
 # CORS settings for frontend integration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -181,6 +318,8 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "if-match",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
@@ -190,6 +329,7 @@ CORS_ALLOW_HEADERS = [
 # Expose these headers to the browser
 CORS_EXPOSE_HEADERS = [
     "content-type",
+    "etag",
     "x-csrftoken",
 ]
 
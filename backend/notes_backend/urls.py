@@ -26,10 +26,16 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from notes.passwords import hashing_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # JWT Authentication
-    path("api/auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path(
+        "api/auth/login/",
+        hashing_view(TokenObtainPairView.as_view()),
+        name="token_obtain_pair",
+    ),
     path("api/auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     # API Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
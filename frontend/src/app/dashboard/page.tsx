@@ -5,13 +5,22 @@ import Header from "@/components/Header";
 import NoteEditor from "@/components/NoteEditor";
 import NotesList from "@/components/NotesList";
 import Sidebar from "@/components/Sidebar";
-import { authApi, categoriesApi, notesApi } from "@/lib/api";
+import {
+  authApi,
+  categoriesApi,
+  notesApi,
+  subscribeToChanges,
+} from "@/lib/api";
 import { useRouter } from "next/navigation";
-import { useCallback, useEffect, useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import { toast } from "react-hot-toast";
 
 import type { Category, Note } from "@/types";
 
+// Milliseconds to wait for more change events before reloading; bulk
+// operations and imports send several in quick succession
+const CHANGE_RELOAD_DELAY = 500;
+
 export default function DashboardPage() {
   const router = useRouter();
   const [notes, setNotes] = useState<Note[]>([]);
@@ -25,9 +34,12 @@ export default function DashboardPage() {
   const [showCategoryManager, setShowCategoryManager] = useState(false);
   const [userEmail, setUserEmail] = useState<string>("");
 
-  const loadData = useCallback(async () => {
+  // quiet: reload in place, as after a change event, without the spinner
+  const loadData = useCallback(async (quiet = false) => {
     try {
-      setLoading(true);
+      if (!quiet) {
+        setLoading(true);
+      }
       const [notesResponse, categoriesResponse, profileResponse] =
         await Promise.all([
           notesApi.getAll({
@@ -40,10 +52,6 @@ export default function DashboardPage() {
         ]);
 
       console.log("FRONTEND: Raw API response:", notesResponse);
-      console.log(
-        "FRONTEND: First note content:",
-        notesResponse.results[0]?.content
-      );
 
       // Sort notes with pinned ones first, then by updated_at descending
       const sortedNotes = notesResponse.results.sort((a, b) => {
@@ -91,6 +99,28 @@ export default function DashboardPage() {
     loadData();
   }, [loadData, router]);
 
+  // The subscription outlives filter changes, so it reloads through a ref
+  const loadDataRef = useRef(loadData);
+  useEffect(() => {
+    loadDataRef.current = loadData;
+  }, [loadData]);
+
+  // Pick up changes made in other tabs and on other devices
+  useEffect(() => {
+    if (!localStorage.getItem("accessToken")) {
+      return;
+    }
+    let reload: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = subscribeToChanges(() => {
+      clearTimeout(reload);
+      reload = setTimeout(() => loadDataRef.current(true), CHANGE_RELOAD_DELAY);
+    });
+    return () => {
+      clearTimeout(reload);
+      unsubscribe();
+    };
+  }, []);
+
   const handleCreateNote = async () => {
     const newNote = {
       title: "New Note",
@@ -112,7 +142,11 @@ export default function DashboardPage() {
 
   const handleUpdateNote = async (id: number, updates: Partial<Note>) => {
     try {
-      const updatedNote = await notesApi.update(id, updates);
+      // The selected note is fully loaded, so its content can be diffed
+      const updatedNote =
+        selectedNote?.id === id
+          ? await notesApi.save(selectedNote, updates)
+          : await notesApi.update(id, updates);
       setNotes((prev) =>
         prev.map((note) => (note.id === id ? updatedNote : note))
       );
@@ -127,6 +161,16 @@ export default function DashboardPage() {
     }
   };
 
+  const handleSelectNote = async (note: Note) => {
+    // List items only carry a content preview, so load the full note
+    try {
+      setSelectedNote(await notesApi.getById(note.id));
+    } catch (error) {
+      console.error("Error loading note:", error);
+      toast.error("Failed to load note");
+    }
+  };
+
   const handleDeleteNote = async (id: number) => {
     try {
       await notesApi.delete(id);
@@ -364,7 +408,7 @@ export default function DashboardPage() {
             notes={notes}
             loading={loading}
             selectedNote={selectedNote}
-            onSelectNote={setSelectedNote}
+            onSelectNote={handleSelectNote}
             onTogglePin={handleTogglePin}
             onToggleArchive={handleToggleArchive}
             onDeleteNote={handleDeleteNote}
@@ -52,15 +52,29 @@ export default function NoteEditor({
   const handleSave = async () => {
     if (!note || isSaving) return;
 
+    // Send only the fields that changed; unchanged notes need no request
+    const edited: Partial<Note> = {
+      title: title?.trim() || "Untitled",
+      content: content?.trim() || "",
+      priority,
+      category: categoryId,
+    };
+    const updates: Partial<Note> = Object.fromEntries(
+      Object.entries(edited).filter(
+        ([field, value]) => note[field as keyof Note] !== value
+      )
+    );
+    if (tags.join(",") !== (note.tag_list || []).join(",")) {
+      updates.tag_list = tags;
+    }
+    if (Object.keys(updates).length === 0) {
+      onStopEditing();
+      return;
+    }
+
     setIsSaving(true);
     try {
-      await onUpdateNote(note.id, {
-        title: title?.trim() || "Untitled",
-        content: content?.trim() || "",
-        priority,
-        category: categoryId,
-        tag_list: tags,
-      });
+      await onUpdateNote(note.id, updates);
       onStopEditing();
     } catch (error) {
       console.error("Error saving note:", error);
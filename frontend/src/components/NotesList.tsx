@@ -109,7 +109,7 @@ export default function NotesList({
                     </div>
 
                     <p className="mb-2 line-clamp-2 text-sm text-gray-600">
-                      {note.content || "No content"}
+                      {(note.content_preview ?? note.content) || "No content"}
                     </p>
 
                     <div className="flex items-center justify-between">
@@ -1,17 +1,27 @@
 import axios from "axios";
 
 import type {
+  BulkNoteOperation,
+  BulkNoteResponse,
   Category,
+  ChangeEvent,
   CreateCategoryData,
+  ContentOp,
+  ContentPatchResponse,
   CreateNoteData,
+  ExportFormat,
+  ImportResponse,
+  Job,
   LoginResponse,
   Note,
   NotesStats,
   ProfileResponse,
   RefreshTokenResponse,
   SignupResponse,
+  SyncResponse,
   UpdateNoteData,
 } from "@/types";
+import { contentOps } from "@/lib/textDiff";
 
 const API_BASE_URL =
   process.env.NEXT_PUBLIC_API_BASE_URL || "http://localhost:8000";
@@ -128,10 +138,44 @@ export const notesApi = {
   },
 
   update: async (id: number, data: UpdateNoteData): Promise<Note> => {
-    const response = await api.put(`/notes/${id}/`, data);
+    const response = await api.patch(`/notes/${id}/`, data);
     return response.data;
   },
 
+  patchContent: async (
+    id: number,
+    baseHash: string,
+    ops: ContentOp[]
+  ): Promise<ContentPatchResponse> => {
+    const response = await api.patch(`/notes/${id}/content/`, {
+      base_hash: baseHash,
+      ops,
+    });
+    return response.data;
+  },
+
+  /**
+   * Saves edits to a fully loaded note. A content change is sent as edit ops
+   * against the note's content_hash, not as the whole body. If the note
+   * changed on the server in the meantime, the request fails with 409.
+   */
+  save: async (note: Note, updates: UpdateNoteData): Promise<Note> => {
+    const { content, ...fields } = updates;
+    if (content === undefined || !note.content_hash) {
+      return notesApi.update(note.id, updates);
+    }
+
+    const ops = contentOps(note.content, content);
+    const patched =
+      ops.length > 0
+        ? await notesApi.patchContent(note.id, note.content_hash, ops)
+        : null;
+    if (Object.keys(fields).length > 0) {
+      return notesApi.update(note.id, fields);
+    }
+    return patched ? { ...note, ...patched, content } : note;
+  },
+
   delete: async (id: number): Promise<void> => {
     await api.delete(`/notes/${id}/`);
   },
@@ -150,12 +194,27 @@ export const notesApi = {
     return response.data;
   },
 
+  bulk: async (
+    ids: number[],
+    operation: BulkNoteOperation,
+    category?: number | null
+  ): Promise<BulkNoteResponse> => {
+    const response = await api.post("/notes/bulk/", {
+      ids,
+      operation,
+      ...(category !== undefined && { category }),
+      // Large operations would otherwise come back as a job
+      background: false,
+    });
+    return response.data;
+  },
+
   getArchived: async (): Promise<{ results: Note[]; count: number }> => {
     const response = await api.get("/notes/archived/");
     return response.data;
   },
 
-  getPinned: async (): Promise<Note[]> => {
+  getPinned: async (): Promise<{ results: Note[]; count: number }> => {
     const response = await api.get("/notes/pinned/");
     return response.data;
   },
@@ -164,6 +223,170 @@ export const notesApi = {
     const response = await api.get("/notes/stats/");
     return response.data;
   },
+
+  /**
+   * Fetches what changed since the cursor of the previous sync, or
+   * everything without one. Call again with the returned cursor while
+   * has_more is true.
+   */
+  sync: async (since?: string): Promise<SyncResponse> => {
+    const response = await api.get("/notes/sync/", {
+      params: since ? { since } : undefined,
+    });
+    return response.data;
+  },
+
+  /**
+   * Downloads every note, with its category and tags, as a JSON Lines,
+   * CSV or Markdown zip file.
+   */
+  export: async (format: ExportFormat = "jsonl"): Promise<Blob> => {
+    const response = await api.get("/notes/export/", {
+      params: { format, background: false },
+      responseType: "blob",
+    });
+    return response.data;
+  },
+
+  import: async (
+    file: File,
+    options?: ImportOptions
+  ): Promise<ImportResponse> => {
+    const form = importForm(file, options);
+    form.append("background", "false");
+    const response = await api.post("/notes/import/", form, {
+      headers: { "Content-Type": "multipart/form-data" },
+    });
+    return response.data;
+  },
+
+  // Background variants: each queues a job to follow with jobsApi.get()
+  startBulk: async (
+    ids: number[],
+    operation: BulkNoteOperation,
+    category?: number | null
+  ): Promise<Job> => {
+    const response = await api.post("/notes/bulk/", {
+      ids,
+      operation,
+      ...(category !== undefined && { category }),
+      background: true,
+    });
+    return response.data;
+  },
+
+  startExport: async (format: ExportFormat = "jsonl"): Promise<Job> => {
+    const response = await api.get("/notes/export/", {
+      params: { format, background: true },
+    });
+    return response.data;
+  },
+
+  startImport: async (file: File, options?: ImportOptions): Promise<Job> => {
+    const form = importForm(file, options);
+    form.append("background", "true");
+    const response = await api.post("/notes/import/", form, {
+      headers: { "Content-Type": "multipart/form-data" },
+    });
+    return response.data;
+  },
+};
+
+type ImportOptions = { format?: ExportFormat; resume_from?: number };
+
+const importForm = (file: File, options?: ImportOptions): FormData => {
+  const form = new FormData();
+  form.append("file", file);
+  if (options?.format) form.append("format", options.format);
+  if (options?.resume_from) {
+    form.append("resume_from", String(options.resume_from));
+  }
+  return form;
+};
+
+// Background jobs API
+export const jobsApi = {
+  getAll: async (): Promise<Job[]> => {
+    const response = await api.get("/jobs/");
+    return response.data.results || response.data;
+  },
+
+  get: async (id: number): Promise<Job> => {
+    const response = await api.get(`/jobs/${id}/`);
+    return response.data;
+  },
+
+  download: async (id: number): Promise<Blob> => {
+    const response = await api.get(`/jobs/${id}/download/`, {
+      responseType: "blob",
+    });
+    return response.data;
+  },
+};
+
+// Seconds to wait before reopening a closed event stream
+const EVENTS_RECONNECT_DELAY = 3;
+
+/**
+ * Listens for changes to the user's notes and categories pushed by the
+ * server. EventSource cannot send headers, so each connection is opened
+ * with a single-use ticket rather than the access token, which would end up
+ * in server logs. A ticket cannot reconnect, so a dropped connection (the
+ * server also closes it when the access token expires) is reopened with a
+ * fresh one, followed by a "resync" event for the changes missed meanwhile.
+ * A server that cannot stream (not running under ASGI) answers the ticket
+ * request with 501, after which it stays closed. Returns a function that closes the connection.
+ */
+export const subscribeToChanges = (
+  onEvent: (event: ChangeEvent) => void
+): (() => void) => {
+  let source: EventSource | null = null;
+  let retry: ReturnType<typeof setTimeout> | undefined;
+  let closed = false;
+
+  const reconnect = () => {
+    if (!closed) {
+      retry = setTimeout(() => open(true), EVENTS_RECONNECT_DELAY * 1000);
+    }
+  };
+
+  const open = async (resync: boolean) => {
+    try {
+      // Sent through the api client, which refreshes an expired token
+      const response = await api.post<{ ticket: string }>("/events/ticket/");
+      if (closed) {
+        return;
+      }
+      const ticket = encodeURIComponent(response.data.ticket);
+      source = new EventSource(`${API_BASE_URL}/api/events/?ticket=${ticket}`);
+      if (resync) {
+        source.addEventListener("open", () => onEvent({ type: "resync" }), {
+          once: true,
+        });
+      }
+      source.addEventListener("change", (message) => {
+        onEvent(JSON.parse((message as MessageEvent).data));
+      });
+      source.onerror = () => {
+        source?.close();
+        reconnect();
+      };
+    } catch (error) {
+      console.error("Error opening the change stream:", error);
+      // 501: the server does not run under ASGI; retrying will not help
+      if (axios.isAxiosError(error) && error.response?.status === 501) {
+        return;
+      }
+      reconnect();
+    }
+  };
+
+  open(false);
+  return () => {
+    closed = true;
+    clearTimeout(retry);
+    source?.close();
+  };
 };
 
 // Authentication API
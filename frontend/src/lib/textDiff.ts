@@ -0,0 +1,50 @@
+import type { ContentOp } from "@/types";
+
+/**
+ * Computes the edit ops that turn `before` into `after`:
+ * - the span between their common prefix and suffix is deleted
+ * - the new text is inserted in its place
+ * Positions are JavaScript string indices (UTF-16 code units), which is what
+ * the content patch endpoint expects. Typing in one place yields a single
+ * small op regardless of the note's length. The span never starts or ends
+ * inside a surrogate pair, which the endpoint would refuse.
+ */
+export function contentOps(before: string, after: string): ContentOp[] {
+  const shorter = Math.min(before.length, after.length);
+
+  let start = 0;
+  while (start < shorter && before[start] === after[start]) {
+    start++;
+  }
+  // Keep a shared high surrogate with the low one that differs
+  if (start > 0 && isHighSurrogate(before.charCodeAt(start - 1))) {
+    start--;
+  }
+
+  let end = 0;
+  while (
+    end < shorter - start &&
+    before[before.length - 1 - end] === after[after.length - 1 - end]
+  ) {
+    end++;
+  }
+  // Likewise a shared low surrogate with the high one before it
+  if (end > 0 && isLowSurrogate(before.charCodeAt(before.length - end))) {
+    end--;
+  }
+
+  const ops: ContentOp[] = [];
+  const removed = before.length - start - end;
+  if (removed > 0) {
+    ops.push({ op: "delete", pos: start, count: removed });
+  }
+  const inserted = after.slice(start, after.length - end);
+  if (inserted) {
+    ops.push({ op: "insert", pos: start, text: inserted });
+  }
+  return ops;
+}
+
+const isHighSurrogate = (code: number) => code >= 0xd800 && code <= 0xdbff;
+
+const isLowSurrogate = (code: number) => code >= 0xdc00 && code <= 0xdfff;
@@ -11,6 +11,8 @@ export interface Note {
   id: number;
   title: string;
   content: string;
+  // List responses send a bounded preview instead of the full content
+  content_preview?: string;
   category: number | null;
   category_name: string | null;
   category_color: string | null;
@@ -19,6 +21,10 @@ export interface Note {
   is_archived: boolean;
   tags: string;
   tag_list: string[];
+  // SHA-256 of content; only sent with full notes
+  content_hash?: string;
+  // Incremented by every write
+  version: number;
   created_at: string;
   updated_at: string;
 }
@@ -32,6 +38,7 @@ export interface NoteListItem {
   priority: "low" | "medium" | "high";
   is_pinned: boolean;
   is_archived: boolean;
+  version: number;
   created_at: string;
   updated_at: string;
 }
@@ -59,12 +66,103 @@ export interface CreateCategoryData {
   color?: string;
 }
 
+export type ContentOp =
+  | { op: "insert"; pos: number; text: string }
+  | { op: "delete"; pos: number; count: number };
+
+export interface ContentPatchResponse {
+  id: number;
+  version: number;
+  content_hash: string;
+  updated_at: string;
+}
+
+export type BulkNoteOperation =
+  | "pin"
+  | "unpin"
+  | "archive"
+  | "unarchive"
+  | "set_category"
+  | "delete";
+
+export interface BulkNoteResponse {
+  operation: BulkNoteOperation;
+  processed: number;
+  results: { id: number; status: "updated" | "deleted" | "not_found" }[];
+}
+
+export type ExportFormat = "jsonl" | "csv" | "markdown-zip";
+
+export interface ImportResponse {
+  records: number;
+  imported: number;
+  skipped: number;
+  errors: { record: number; errors: Record<string, string[]> }[];
+}
+
+export type JobStatus = "queued" | "running" | "succeeded" | "failed";
+
+export interface Job {
+  id: number;
+  kind: "export" | "import" | "bulk" | "reindex";
+  status: JobStatus;
+  progress: Record<string, unknown>;
+  result: Record<string, unknown> | null;
+  error: string;
+  attempts: number;
+  max_attempts: number;
+  run_after: string;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  download_url: string | null;
+}
+
+export interface SyncResponse {
+  notes: Note[];
+  categories: Category[];
+  deleted: { notes: number[]; categories: number[] };
+  cursor: string;
+  has_more: boolean;
+}
+
+// Pushed by /api/events/ after each write
+export type ChangeEvent =
+  | {
+      type: "note.created" | "note.updated";
+      id: number;
+      version: number;
+    }
+  | {
+      type:
+        | "note.deleted"
+        | "category.created"
+        | "category.updated"
+        | "category.deleted";
+      id: number;
+    }
+  | {
+      type: "notes.bulk";
+      operation: BulkNoteOperation | "import";
+      ids: number[];
+    }
+  // Events were dropped; sync to catch up
+  | { type: "resync" };
+
 export interface NotesStats {
   total_notes: number;
   active_notes: number;
   pinned_notes: number;
   archived_notes: number;
   categories_count: number;
+  by_priority: Record<Note["priority"], number>;
+  by_category: {
+    id: number;
+    name: string;
+    color: string;
+    notes_count: number;
+  }[];
+  uncategorized_notes: number;
 }
 
 // Authentication types